@@ -1,11 +1,15 @@
-from scipy.spatial import KDTree
-from typing import Optional, List, Tuple
+from scipy.spatial import cKDTree as KDTree
+from typing import Dict, List, Tuple
 
 NOISE = -1
 
 
 def dbscan(points: List[Tuple], eps: float, min_points: int) -> List[int]:
-    """Template for k-means method: it takes a partitioning function as input.
+    """DBSCAN clustering.
+    Rather than expanding one cluster at a time, with a query to the k-d tree for each point reached, it works in
+    two phases: first, the number of neighbors of every point, and all the pairs of points within distance `eps`,
+    are retrieved from the k-d tree in bulk; then clusters are formed by merging, with a Union-Find, the core
+    points that are close to each other (the connected components of the graph of core points).
 
     Args:
         points: A list of points to cluster.
@@ -13,24 +17,40 @@ def dbscan(points: List[Tuple], eps: float, min_points: int) -> List[int]:
         min_points: The minimum number of points that needs to be within a distance `eps` for a point to be a core point.
 
     Returns:
-        A list of the cluster indices for each point.
+        A list of the cluster indices for each point. Clusters are numbered starting from 1, in the order of
+        the first point (in `points`) belonging to them.
     """
     n = len(points)
-    cluster_indices: List[Optional[int]] = [None] * n
-    current_index = 0
     kd_tree = KDTree(points)
+    # Neighbors are counted for all points at once, with a single (batched, multi-threaded) query
+    is_core = kd_tree.query_ball_point(points, r=eps, workers=-1, return_length=True) >= min_points
+    # Each pair of points within distance eps is returned exactly once, as (i, j) with i < j
+    pairs = kd_tree.query_pairs(eps, output_type='ndarray')
+    core_pairs = pairs[is_core[pairs[:, 0]] & is_core[pairs[:, 1]]]
+
+    # Union-Find over the points: the root of each set is always its smallest index
+    parents = list(range(n))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            # Path halving
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for i, j in core_pairs.tolist():
+        root_i, root_j = find(i), find(j)
+        if root_i < root_j:
+            parents[root_j] = root_i
+        elif root_j < root_i:
+            parents[root_i] = root_j
+
+    cluster_indices = [NOISE] * n
+    cluster_by_root: Dict[int, int] = {}
     for i in range(n):
-        if cluster_indices[i] is not None:
-            continue
-        process_set = {i}
-        cluster_indices[i] = NOISE
-        current_index += 1
-        while len(process_set) > 0:
-            j = process_set.pop()
-            neighbors = kd_tree.query(points[j], k=None, distance_upper_bound=eps)
-            if len(neighbors) < min_points:
-                continue
-            cluster_indices[j] = current_index
-            process_set |= filter(lambda p: cluster_indices[p] is None or (p != j and cluster_indices[p] == NOISE),
-                                  neighbors)
+        if is_core[i]:
+            root = find(i)
+            if root not in cluster_by_root:
+                cluster_by_root[root] = len(cluster_by_root) + 1
+            cluster_indices[i] = cluster_by_root[root]
     return cluster_indices
@@ -1,104 +1,181 @@
-from collections import Counter
-from itertools import groupby
+import numpy as np
+
 from random import random, sample
-from scipy.spatial import KDTree
-from statistics import mean
-from operator import itemgetter
-from typing import Callable, List, Tuple
+from scipy.spatial import cKDTree as KDTree
+from scipy.spatial.distance import cdist
+from typing import Callable, List, Optional, Tuple, Union
+
+try:
+    # Optional: SIMD-accelerated distance kernels, used by `__partition_points_compact` when available
+    import simsimd
+except ImportError:
+    simsimd = None
 
+try:
+    # Optional: JIT compilation of the brute-force partitioning, used by `__partition_points_numba` when available
+    import numba
+except ImportError:
+    numba = None
 
-def __euclidean_squared_distance(p: Tuple, q: Tuple) -> float:
-    """The square of Euclidean distance between 2 points.
+
+def __update_centroids(points: np.ndarray, cluster_indices: np.ndarray) -> List[Tuple]:
+    """Update the centroids for each cluster, by computing the center of mass for the cluster.
+       Points don't need to be grouped by cluster: `np.bincount` sums, in a single pass, the coordinates of
+       the points in each cluster (one coordinate at a time), as well as the number of points per cluster.
+       Clusters left with no points are dropped.
 
     Args:
-        p: One of the points whose distance will be computed.
-        q: One of the points whose distance will be computed.
+        points: The (n, d) array of points to group.
+        cluster_indices: The array of cluster indices for the points. Must reflect the order of `points`.
 
     Returns:
-        A floating point value for the Euclidean distance between the two arguments.
+        The list of centroids for each cluster. The point at index `i` is the centroid for the `i`-th cluster.
     """
-    dim = len(p)
-    return sum([(p[i] - q[i]) ** 2 for i in range(dim)])
+    counts = np.bincount(cluster_indices)
+    sums = np.column_stack([np.bincount(cluster_indices, weights=points[:, j], minlength=len(counts))
+                            for j in range(points.shape[1])])
+    non_empty = counts > 0
+    return [tuple(c) for c in (sums[non_empty] / counts[non_empty, None]).tolist()]
 
 
-def __group_points_by_cluster(points: List[Tuple], cluster_indices: List[int]) -> List[List[Tuple]]:
-    """Takes a list of points and another list with their cluster_indices, groups the points by cluster_indices and
-       returns the list of points.
+def __partition_points_compact(points: np.ndarray, centroids: List[Tuple]) -> np.ndarray:
+    """Finds the closest centroid to each point by computing the full matrix of squared distances between each
+       (data point, centroid) pair with a `cdist` function, and then taking the index of the minimum on each row.
+       If SimSIMD is installed, its SIMD kernels (run on single-precision coordinates) are used,
+       otherwise it falls back to SciPy's `cdist`.
 
     Args:
-        points: The list of points to group.
-        cluster_indices: The list of cluster indices for the points. Must reflect the order of `points`.
+        points: The (n, d) array of points to partition.
+        centroids: The list of centroids to which the points will be assigned.
 
     Returns:
-        A list of clusters, where each cluster is a list of points.
+        An array of indices: for each point, the index of the closest centroid.
     """
-    n = len(points)
-    get_point_label = lambda i: cluster_indices[i]
-    clusters = groupby(sorted(range(n), key=get_point_label), key=get_point_label)
-    return [[points[i] for i in group] for _, group in clusters]
-
-
-def __update_centroids(points: List[Tuple], cluster_indices: List[int]) -> List[Tuple]:
-    """Update the centroids for each cluster, by computing the center of mass for the cluster.
+    if simsimd is None:
+        return cdist(points, np.asarray(centroids, dtype=points.dtype), 'sqeuclidean').argmin(1)
+    distances = simsimd.cdist(np.ascontiguousarray(points, dtype=np.float32),
+                              np.ascontiguousarray(centroids, dtype=np.float32), metric='sqeuclidean')
+    return np.asarray(distances).argmin(1)
+
+
+def __partition_points(points: np.ndarray, centroids: List[Tuple]) -> np.ndarray:
+    """Finds the closest centroid to each point by comparing the distances of all (data point, centroid) pairs.
+       Rather than looping through the pairs, the distances are computed all at once using the identity
+       ||p - c||^2 = ||p||^2 + ||c||^2 - 2 p.c, so that the bulk of the work is a single matrix product P C^T
+       (delegated by NumPy to BLAS, in the same precision as `points`). Since ||p||^2 is the same for all centroids,
+       it doesn't change which one is the closest to p, and it's not computed at all: only the k norms of the
+       centroids are needed.
+       Both points and centroids are first translated by the mean of the centroids: far from the origin, the
+       difference between ||c||^2 and 2 p.c would otherwise cancel out most of their significant digits (in single
+       precision, enough to assign points to the wrong centroid).
 
     Args:
-        points: The list of points to group.
-        cluster_indices: The list of cluster indices for the points. Must reflect the order of `points`.
+        points: The (n, d) array of points to partition.
+        centroids: The list of centroids to which the points will be assigned.
 
     Returns:
-        The list of centroids for each cluster. The point at index `i` is the centroid for the `i`-th cluster.
+        An array of indices: for each point, the index of the closest centroid.
     """
-    dim = len(points[0])
-    clusters = __group_points_by_cluster(points, cluster_indices)
-    return [tuple(mean([p[j] for p in C]) for j in range(dim)) for C in clusters]
-
-
-def __partition_points_compact(points: List[Tuple], centroids: List[Tuple]) -> List[int]:
-    return [min(enumerate(map(lambda c: __euclidean_squared_distance(p, c), centroids)), key=itemgetter(1)) for p in points]
-
-
-def __partition_points(points: List[Tuple], centroids: List[Tuple]) -> List[int]:
-    """Finds the closest centroid to each point by going through all (centroid, data point) pairs and for each computing
-       the distance between the two points.
+    C = np.asarray(centroids, dtype=np.float64)
+    # Rounded to the points' precision, so that points and centroids are translated by exactly the same vector
+    center = C.mean(0).astype(points.dtype)
+    C = (C - center).astype(points.dtype)
+    C2 = (C * C).sum(1)
+    return (C2[None, :] - 2.0 * (points - center) @ C.T).argmin(1)
+
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def __assign_to_closest_centroid(points: np.ndarray, centroids: np.ndarray, out: np.ndarray) -> None:
+        """Compiled kernel for `__partition_points_numba`: for each point (in parallel), finds the closest centroid,
+           computing the distances and their minimum in the same loop, and stores its index in `out`.
+        """
+        n, d = points.shape
+        k = centroids.shape[0]
+        for j in numba.prange(n):
+            # The search starts from the first centroid, rather than from an infinite distance: fastmath allows
+            # the compiler to assume that no value is infinite
+            index = 0
+            min_distance = 0.0
+            for t in range(d):
+                min_distance += (points[j, t] - centroids[0, t]) ** 2
+            for i in range(1, k):
+                distance = 0.0
+                for t in range(d):
+                    distance += (points[j, t] - centroids[i, t]) ** 2
+                if distance < min_distance:
+                    min_distance = distance
+                    index = i
+            out[j] = index
+
+    def __make_assign_to_closest_centroid(dim: int) -> Callable:
+        """Creates a version of `__assign_to_closest_centroid` specialized for points with `dim` coordinates.
+           Since the dimension is a compile-time constant, the compiler can fully unroll (and vectorize) the
+           loop over the coordinates.
+        """
+        @numba.njit(parallel=True, fastmath=True, cache=True)
+        def assign_to_closest_centroid(points: np.ndarray, centroids: np.ndarray, out: np.ndarray) -> None:
+            n = points.shape[0]
+            k = centroids.shape[0]
+            for j in numba.prange(n):
+                # As in `__assign_to_closest_centroid`, the search starts from the first centroid
+                index = 0
+                min_distance = 0.0
+                for t in range(dim):
+                    min_distance += (points[j, t] - centroids[0, t]) ** 2
+                for i in range(1, k):
+                    distance = 0.0
+                    for t in range(dim):
+                        distance += (points[j, t] - centroids[i, t]) ** 2
+                    if distance < min_distance:
+                        min_distance = distance
+                        index = i
+                out[j] = index
+        return assign_to_closest_centroid
+
+    # Kernels are only compiled the first time they are called. For higher dimensions, unrolling the loop
+    # turned out to be slower than the generic kernel
+    __assign_to_closest_centroid_by_dim = {dim: __make_assign_to_closest_centroid(dim) for dim in (2, 3, 4)}
+
+
+def __partition_points_numba(points: np.ndarray, centroids: List[Tuple]) -> np.ndarray:
+    """Finds the closest centroid to each point by going through all (centroid, data point) pairs, in a loop
+       JIT-compiled by Numba and parallelized over the points. Unlike `__partition_points`, it doesn't need to
+       allocate the (n, k) matrix of distances.
+       For the most common dimensions, a kernel specialized on the dimension of the points is used.
+       If Numba is not installed, it falls back to `__partition_points`.
 
     Args:
-        points: The list of points to partition.
+        points: The (n, d) array of points to partition.
         centroids: The list of centroids to which the points will be assigned.
 
     Returns:
-        A list of indices: for each point, the index of the closest centroid.
+        An array of indices: for each point, the index of the closest centroid.
     """
-    n = len(points)
-    k = len(centroids)
-    result = [0] * n
-
-    for j in range(n):
-        min_distance = float('inf')
-        index = 0
-        for i in range(k):
-            distance = __euclidean_squared_distance(points[j], centroids[i])
-            if distance < min_distance:
-                min_distance = distance
-                index = i
-
-        result[j] = index
+    if numba is None:
+        return __partition_points(points, centroids)
+    result = np.empty(len(points), dtype=np.int32)
+    kernel = __assign_to_closest_centroid_by_dim.get(points.shape[1], __assign_to_closest_centroid)
+    # The compiled loop is faster in double precision, even including the conversion of single-precision points
+    kernel(np.ascontiguousarray(points, dtype=np.float64),
+           np.ascontiguousarray(centroids, dtype=np.float64), result)
     return result
 
 
-def __partition_points_kd_tree(points: List[Tuple], centroids: List[Tuple]) -> List[int]:
-    """Finds the closest centroid to each point by creating a k-d tree and querying it for each point's NN.
-    Note: kd_tree.query returns a tuple (distance, index), where index is the index of the closest point in k-d tree's
-          data array, that has the same order than the initialization list.
+def __partition_points_kd_tree(points: np.ndarray, centroids: List[Tuple]) -> np.ndarray:
+    """Finds the closest centroid to each point by creating a k-d tree and querying it for all points' NNs at once.
+    Note: kd_tree.query returns a tuple (distances, indices), where indices are the indices of the closest points in
+          k-d tree's data array, that has the same order than the initialization list.
 
     Args:
-        points: The list of points to partition.
+        points: The (n, d) array of points to partition.
         centroids: The list of centroids to which the points will be assigned.
 
     Returns:
-        A list of indices: for each point, the index of the closest centroid.
+        An array of indices: for each point, the index of the closest centroid.
     """
     kd_tree = KDTree(centroids)
-    return [kd_tree.query(p)[1] for p in points]
+    return kd_tree.query(points, workers=-1)[1]
 
 
 def __add_or_subtract_random_five_percent(p: Tuple[float]):
@@ -114,20 +191,24 @@ def __add_or_subtract_random_five_percent(p: Tuple[float]):
     return [x * (0.95 + random() / 10) for x in p]
 
 
-def __random_centroid_init(points, k):
+def __random_centroid_init(points: np.ndarray, k: int):
     """ Randomly initialize the centroids.
         Chooses k points from the dataset, then for each of them
         and for each coordinate adds or subtracts a random value, within 5% of the coordinate value.
     """
-    return [__add_or_subtract_random_five_percent(p) for p in sample(points, k)]
+    return [__add_or_subtract_random_five_percent(points[i]) for i in sample(range(len(points)), k)]
 
 
-def k_means(points: List[Tuple], num_centroids: int, max_iter: int, partitioning_function: Callable) -> \
-        Tuple[List[Tuple[float]], List[int]]:
+def k_means(points: Union[List[Tuple], np.ndarray], num_centroids: int, max_iter: int,
+            partitioning_function: Callable) -> Tuple[List[Tuple[float]], List[int]]:
     """Template for k-means method: it takes a partitioning function as input.
+    Coordinates are stored, and distances computed, in single precision: it halves the memory traffic, and doubles
+    the number of values processed by each SIMD instruction. Centroids are still computed in double precision.
+    (For data far from the origin, the brute-force partitioning functions must take care not to lose precision: see
+    `__partition_points`.)
 
     Args:
-        points: A list of points to cluster.
+        points: A list of points to cluster (or, equivalently, an (n, d) array).
         num_centroids: The desired number of clusters.
         max_iter: The maximum number of iterations of k-mean's main cycle allowed.
         partitioning_function: The function to be used to partition points based on centroids. It is passed as
@@ -137,20 +218,19 @@ def k_means(points: List[Tuple], num_centroids: int, max_iter: int, partitioning
     Returns:
         A list of the centroids, and a list of the indices for each point.
     """
+    points = np.ascontiguousarray(points, dtype=np.float32)
     centroids = __random_centroid_init(points, num_centroids)
-    cluster_indices = []
+    cluster_indices: Optional[np.ndarray] = None
     for _ in range(max_iter):
-        new_cluster_indices = partitioning_function(points, centroids)
-        # Comparing two lists... be aware of the hidden overhead of this implementation!
-        # (hint: takes between 2n and 3n operations, instead of just between 1 and n)
-        if Counter(new_cluster_indices) == Counter(cluster_indices):
+        new_cluster_indices = np.asarray(partitioning_function(points, centroids), dtype=np.int32)
+        if cluster_indices is not None and np.array_equal(new_cluster_indices, cluster_indices):
             # no update from last iteration: the algorithm converged to a (local) minimum
             break
         else:
             # update cluster_indices
             cluster_indices = new_cluster_indices
         centroids = __update_centroids(points, cluster_indices)
-    return centroids, cluster_indices
+    return centroids, [] if cluster_indices is None else cluster_indices.tolist()
 
 
 def k_means_classic(points: List[Tuple], num_centroids: int, max_iter: int) -> Tuple[List[Tuple[float]], List[int]]:
@@ -163,3 +243,7 @@ def k_means_kd_tree(points: List[Tuple], num_centroids: int, max_iter: int) -> T
 
 def k_means_compact(points: List[Tuple], num_centroids: int, max_iter: int) -> Tuple[List[Tuple[float]], List[int]]:
     return k_means(points, num_centroids, max_iter, __partition_points_compact)
+
+
+def k_means_numba(points: List[Tuple], num_centroids: int, max_iter: int) -> Tuple[List[Tuple[float]], List[int]]:
+    return k_means(points, num_centroids, max_iter, __partition_points_numba)
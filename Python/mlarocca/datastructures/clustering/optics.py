@@ -1,6 +1,7 @@
 import heapq
+import numpy as np
 
-from scipy.spatial import KDTree
+from scipy.spatial import cKDTree as KDTree
 from typing import Optional, List, Tuple
 
 NOISE = -1
@@ -25,6 +26,13 @@ def optics(points: List[Tuple], eps: float, min_points: int) -> Tuple[List[float
             return None
         return distances[min_points - 1]
 
+    def neighborhood(p: int) -> Tuple[List[float], List[int]]:
+        """Distances and indices of the points within `eps` from `p`, sorted by increasing distance."""
+        neighbors = np.asarray(all_neighbors[p], dtype=np.intp)
+        distances = np.linalg.norm(kd_tree.data[neighbors] - kd_tree.data[p], axis=1)
+        order = distances.argsort(kind='stable')
+        return distances[order].tolist(), neighbors[order].tolist()
+
     def update(neighbors: List[int], distances: List[float], p: int, seeds: List[Tuple[float, int]]) -> \
             List[Tuple[float, int]]:
         core_dist = core_distance(distances)
@@ -34,22 +42,19 @@ def optics(points: List[Tuple], eps: float, min_points: int) -> Tuple[List[float
             if not processed[q]:
                 new_r_dist = max(core_dist, dist)
                 old_r_dist = reachability_distances[q]
-                if old_r_dist is None:
+                if old_r_dist is None or new_r_dist < old_r_dist:
                     reachability_distances[q] = new_r_dist
+                    # Instead of updating the priority of q's entry (if any), a new entry is added:
+                    # the old one is left in the heap, and will be discarded when popped (lazy deletion)
                     heapq.heappush(seeds, (new_r_dist, q))
-                elif new_r_dist < old_r_dist:
-                    reachability_distances[q] = new_r_dist
-                    for i in range(len(seeds)):
-                        if seeds[i][1] == q:
-                            seeds[i] = (new_r_dist, q)
-                    # It would be more efficient with an implementation of a "update priority"
-                    heapq.heapify(seeds)
         return seeds
 
     n = len(points)
     processed = [False] * n
     reachability_distances: List[Optional[float]] = [None] * n
     kd_tree = KDTree(points)
+    # Each point's neighborhood is needed exactly once: retrieve them all with a single (batched, multi-threaded) query
+    all_neighbors = kd_tree.query_ball_point(points, r=eps, workers=-1)
     ordered_list = []
 
     for p in range(n):
@@ -58,15 +63,18 @@ def optics(points: List[Tuple], eps: float, min_points: int) -> Tuple[List[float
 
         ordered_list.append(p)
         processed[p] = True
-        p_distances, p_neighbors = kd_tree.query(points[p], k=None, distance_upper_bound=eps)
+        p_distances, p_neighbors = neighborhood(p)
 
         if core_distance(p_distances) is not None:
             #reachability_distances[p] = core_distance(p_distances)
             seeds: List[Tuple[float, int]] = []
             seeds = update(p_neighbors, p_distances, p, seeds)
             while len(seeds) > 0:
-                (_, q) = heapq.heappop(seeds)
-                q_distances, q_neighbors = kd_tree.query(points[q], k=None, distance_upper_bound=eps)
+                (r_dist, q) = heapq.heappop(seeds)
+                if processed[q] or r_dist != reachability_distances[q]:
+                    # Stale entry, superseded by one with a lower reachability distance
+                    continue
+                q_distances, q_neighbors = neighborhood(q)
                 processed[q] = True
                 ordered_list.append(q)
                 if core_distance(q_distances) is not None:
@@ -0,0 +1,188 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, initializedcheck=False, cdivision=True
+"""Cython implementation of a d-ary heap, with the same interface as `dway_heap.DWayHeap`.
+
+This extension is optional, and it is not built automatically: to build it, install Cython and run
+`cythonize -i _dway_heap_cy.pyx` in this folder. Modules using it fall back to `DWayHeap` when it isn't
+available (and the tests for it are skipped).
+"""
+from libc.stdlib cimport free, realloc
+
+
+cdef class DWayHeapC:
+    """Implementation of a d-ary heap, equivalent to `DWayHeap`, compiled with Cython.
+    The priorities are kept in a C array of doubles, so that comparing them in `_push_down` and `_bubble_up`
+    doesn't require boxing them into Python floats; the elements are kept in a parallel Python list."""
+
+    cdef double* _priorities
+    cdef Py_ssize_t _capacity
+    cdef list _elements
+    cdef readonly Py_ssize_t D
+
+    def __cinit__(self):
+        self._priorities = NULL
+        self._capacity = 0
+        self._elements = []
+
+    def __init__(self, elements=[], priorities=[], Py_ssize_t branching_factor=2):
+        """Constructor
+
+        Args:
+            elements: The elements for initializing the heap.
+            priorities: The priorities of the elements above. Must have the same length as `elements`.
+            branching_factor: The (max) number of children for each node in the heap. Must be at least 2.
+        """
+        if len(elements) != len(priorities):
+            raise ValueError(f'The length of the elements list ({len(elements)})'
+                             f' must match the length of the priorities list ({len(priorities)}).')
+        if branching_factor < 2:
+            raise ValueError(f'Branching factor ({branching_factor}) must be greater than 1.')
+        self.D = branching_factor
+
+        if len(elements) > 0:
+            self._heapify(elements, priorities)
+
+    def __dealloc__(self):
+        free(self._priorities)
+
+    def __len__(self):
+        return len(self._elements)
+
+    cdef int _reserve(self, Py_ssize_t capacity) except -1:
+        """Makes sure the array of priorities can hold at least `capacity` entries."""
+        cdef double* priorities
+        if capacity <= self._capacity:
+            return 0
+        capacity = max(capacity, 2 * self._capacity, 16)
+        priorities = <double*> realloc(self._priorities, capacity * sizeof(double))
+        if priorities == NULL:
+            raise MemoryError()
+        self._priorities = priorities
+        self._capacity = capacity
+        return 0
+
+    def _validate(self):
+        """Checks that every node holds the highest priority in the subtree rooted at that node.
+
+        Returns: True if the heap invariant is met.
+        """
+        cdef Py_ssize_t size = len(self._elements)
+        cdef Py_ssize_t i
+        for i in range(1, size):
+            if self._priorities[(i - 1) // self.D] < self._priorities[i]:
+                return False
+        return True
+
+    cdef void _push_down(self, Py_ssize_t index):
+        """Pushes down the root of a sub-heap towards its leaves to reinstate heap invariants
+        (swapping it with its left-most highest-priority child, as long as it has a lower priority)."""
+        cdef double* priorities = self._priorities
+        cdef list elements = self._elements
+        cdef Py_ssize_t D = self.D
+        cdef Py_ssize_t size = len(elements)
+        # (size + D - 2) // D, rather than (size - 2) // D + 1: with cdivision, division truncates towards zero
+        cdef Py_ssize_t first_leaf = (size + D - 2) // D
+        cdef Py_ssize_t child_index, i, last_child
+        cdef double child_priority
+        cdef double input_priority = priorities[index]
+        input_element = elements[index]
+
+        while index < first_leaf:
+            child_index = index * D + 1
+            child_priority = priorities[child_index]
+            last_child = min(child_index + D, size)
+            for i in range(child_index + 1, last_child):
+                if priorities[i] > child_priority:
+                    child_priority = priorities[i]
+                    child_index = i
+
+            if child_priority <= input_priority:
+                break
+            priorities[index] = child_priority
+            elements[index] = elements[child_index]
+            index = child_index
+
+        priorities[index] = input_priority
+        elements[index] = input_element
+
+    cdef void _bubble_up(self, Py_ssize_t index):
+        """Bubbles up a leaf towards the root of the heap, as long as its parent has a lower priority."""
+        cdef double* priorities = self._priorities
+        cdef list elements = self._elements
+        cdef Py_ssize_t D = self.D
+        cdef Py_ssize_t parent_index
+        cdef double input_priority = priorities[index]
+        input_element = elements[index]
+
+        while index > 0:
+            parent_index = (index - 1) // D
+            if priorities[parent_index] >= input_priority:
+                break
+            priorities[index] = priorities[parent_index]
+            elements[index] = elements[parent_index]
+            index = parent_index
+
+        priorities[index] = input_priority
+        elements[index] = input_element
+
+    def _heapify(self, elements, priorities):
+        """Initializes the heap with a list of elements and priorities.
+
+        Args:
+            elements: The list of elements to add to the heap.
+            priorities: The priorities for those elements (in the same order they are presented).
+        """
+        cdef Py_ssize_t n = len(priorities)
+        cdef Py_ssize_t i
+        self._reserve(n)
+        for i in range(n):
+            self._priorities[i] = priorities[i]
+        self._elements = list(elements)
+        for i in range((n + self.D - 2) // self.D - 1, -1, -1):
+            self._push_down(i)
+
+    def is_empty(self):
+        """Checks if the heap is empty.
+
+        Returns: True if the heap is empty.
+        """
+        return len(self._elements) == 0
+
+    def top(self):
+        """Removes and returns the highest-priority element in the heap.
+        If the heap is empty, raises a `RuntimeError`.
+
+        Returns: The element with highest priority in the heap.
+        """
+        cdef Py_ssize_t last = len(self._elements) - 1
+        if last < 0:
+            raise RuntimeError('Method top called on an empty heap.')
+        if last == 0:
+            return self._elements.pop()
+        element = self._elements[0]
+        self._priorities[0] = self._priorities[last]
+        self._elements[0] = self._elements.pop()
+        self._push_down(0)
+        return element
+
+    def peek(self):
+        """Returns, WITHOUT removing it, the highest-priority element in the heap.
+        If the heap is empty, raises a `RuntimeError`.
+
+        Returns: The element with highest priority in the heap.
+        """
+        if len(self._elements) == 0:
+            raise RuntimeError('Method peek called on an empty heap.')
+        return self._elements[0]
+
+    def insert(self, element, double priority):
+        """Add a new element/priority pair to the heap
+
+        Args:
+            element: The new element to add.
+            priority: The priority associated with the new element
+        """
+        cdef Py_ssize_t size = len(self._elements)
+        self._reserve(size + 1)
+        self._priorities[size] = priority
+        self._elements.append(element)
+        self._bubble_up(size)
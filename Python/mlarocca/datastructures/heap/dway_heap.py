@@ -1,4 +1,11 @@
-from typing import Any, List, Optional, Tuple
+from array import array
+from typing import Any, List
+
+try:
+    # Optional: only needed for `DWayHeap.heapify_numpy`
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class DWayHeap(object):
@@ -15,6 +22,9 @@ class DWayHeap(object):
     so this operation is only made faster with larger branching factors.
     In general values between 3 and 5 are a good compromise and produce good performance."""
 
+    # Below this size, `heapify_numpy` falls back to `_heapify`, since the overhead of NumPy calls isn't paid off
+    NumpyHeapifyThreshold = 1024
+
     def __init__(self, elements: List[Any] = [], priorities: List[float] = [], branching_factor: int = 2) -> None:
         """Constructor
 
@@ -28,7 +38,10 @@ class DWayHeap(object):
                              f' must match the length of the priorities list ({len(priorities)}).')
         if branching_factor < 2:
             raise ValueError(f'Branching factor ({branching_factor}) must be greater than 1.')
-        self._pairs: List[Tuple[float, Any]] = []
+        # Priorities and elements are stored in two parallel arrays: the priorities, that are accessed much more often
+        # (to compare them), are kept in a compact array of doubles
+        self._priorities: array = array('d')
+        self._elements: List[Any] = []
         self.D = branching_factor
 
         if len(elements) > 0:
@@ -46,7 +59,7 @@ class DWayHeap(object):
 
         Returns: The number of elements in the heap.
         """
-        return len(self._pairs)
+        return len(self._priorities)
 
     def _validate(self) -> bool:
         """Checks that the three invariants for heaps are abided by.
@@ -59,11 +72,11 @@ class DWayHeap(object):
         current_index = 0
         first_leaf = self.first_leaf_index()
         while current_index < first_leaf:
-            current_priority: float = self._pairs[current_index][0]
+            current_priority: float = self._priorities[current_index]
             first_child = self._first_child_index(current_index)
             last_child_guard = min(first_child + self.D, len(self))
             for child_index in range(first_child, last_child_guard):
-                if current_priority < self._pairs[child_index][0]:
+                if current_priority < self._priorities[child_index]:
                     return False
             current_index += 1
         return True
@@ -73,27 +86,44 @@ class DWayHeap(object):
         If any of the children of the element has a higher priority, then it swaps current
         element with its highest-priority child C, and recursively checks the sub-heap previously rooted
         at that C.
+        This is the hottest path of the heap, so the search for the left-most highest-priority child and the
+        index arithmetic are inlined in the loop.
 
         Args:
             index: The index of the root of the sub-heap.
         """
 
+        # Attributes used in the loop are bound to local variables, which are faster to look up
+        priorities = self._priorities
+        elements = self._elements
+        D = self.D
+        size = len(priorities)
+
         # INVARIANT: 0 <= index < n
-        assert (0 <= index < len(self._pairs))
-        input_pair = self._pairs[index]
-        input_priority = input_pair[0]
+        assert (0 <= index < size)
+        input_priority = priorities[index]
+        input_element = elements[index]
         current_index = index
-        first_leaf = self.first_leaf_index()
+        first_leaf = (size - 2) // D + 1
         while current_index < first_leaf:
-            child_index = self._highest_priority_child_index(current_index)
-            assert (child_index is not None)
-            if self._pairs[child_index][0] > input_priority:
-                self._pairs[current_index] = self._pairs[child_index]
+            # Finds the left-most child with the highest priority (inner nodes have at least one child)
+            child_index = current_index * D + 1
+            child_priority = priorities[child_index]
+            for i in range(child_index + 1, min(child_index + D, size)):
+                priority = priorities[i]
+                if priority > child_priority:
+                    child_priority = priority
+                    child_index = i
+
+            if child_priority > input_priority:
+                priorities[current_index] = child_priority
+                elements[current_index] = elements[child_index]
                 current_index = child_index
             else:
                 break
 
-        self._pairs[current_index] = input_pair
+        priorities[current_index] = input_priority
+        elements[current_index] = input_element
 
     def _bubble_up(self, index: int) -> None:
         """Bubbles up towards the root an element, to reinstate heap's invariants.
@@ -103,21 +133,29 @@ class DWayHeap(object):
         Args:
             index: The index of the element to bubble up.
         """
+        # Attributes used in the loop are bound to local variables, which are faster to look up
+        priorities = self._priorities
+        elements = self._elements
+        D = self.D
+
         # INVARIANT: 0 <= index < n
-        assert (0 <= index < len(self._pairs))
-        input_pair = self._pairs[index]
-        input_priority = input_pair[0]
+        assert (0 <= index < len(priorities))
+        input_priority = priorities[index]
+        input_element = elements[index]
         while index > 0:
-            parent_index = self._parent_index(index)
-            parent = self._pairs[parent_index]
+            # Same as `_parent_index`, inlined
+            parent_index = (index - 1) // D
+            parent_priority = priorities[parent_index]
 
-            if input_priority > parent[0]:
-                self._pairs[index] = parent
+            if input_priority > parent_priority:
+                priorities[index] = parent_priority
+                elements[index] = elements[parent_index]
                 index = parent_index
             else:
                 break
 
-        self._pairs[index] = input_pair
+        priorities[index] = input_priority
+        elements[index] = input_element
 
     def _first_child_index(self, index) -> int:
         """Computes the index of the first child of a heap node.
@@ -140,32 +178,6 @@ class DWayHeap(object):
         """
         return (index - 1) // self.D
 
-    def _highest_priority_child_index(self, index) -> Optional[int]:
-        """Finds, among the children of a heap node, the one child with highest priority.
-        In case multiple children have the same priority, the left-most is returned.
-
-        Args:
-            index: The index of the heap node whose children are searched.
-
-        Returns: The index of the child of current heap node with highest priority, or None if
-                 current node has no child.
-        """
-        first_index = self._first_child_index(index)
-        size = len(self)
-        last_index = min(first_index + self.D, size)
-
-        if first_index >= size:
-            return None
-
-        highest_priority = -float('inf')
-        index = first_index
-        for i in range(first_index, last_index):
-            if self._pairs[i][0] > highest_priority:
-                highest_priority = self._pairs[i][0]
-                index = i
-
-        return index
-
     def first_leaf_index(self):
         return (len(self) - 2) // self.D + 1
 
@@ -177,11 +189,88 @@ class DWayHeap(object):
             priorities: The priorities for those elements (in the same order they are presented).
         """
         assert (len(elements) == len(priorities))
-        self._pairs = list(zip(priorities, elements))
+        self._priorities = array('d', priorities)
+        self._elements = list(elements)
         last_inner_node_index = self.first_leaf_index() - 1
         for index in range(last_inner_node_index, -1, -1):
             self._push_down(index)
 
+    @classmethod
+    def heapify_in_place(cls, elements: List[Any], priorities: List[float], branching_factor: int = 2) -> 'DWayHeap':
+        """Creates a heap from a list of elements and priorities, like the constructor, but without validating its
+        arguments, and without copying `elements`: the list is used as the heap's own storage, and rearranged in place.
+        The caller must therefore not use, or modify, `elements` after this call.
+
+        Args:
+            elements: The elements for initializing the heap. Must have the same length as `priorities`.
+            priorities: The priorities of the elements above (in the same order they are presented).
+            branching_factor: The (max) number of children for each node in the heap. Must be at least 2.
+
+        Returns: The new heap.
+        """
+        assert (len(elements) == len(priorities) and branching_factor >= 2)
+        heap = cls.__new__(cls)
+        heap._priorities = array('d', priorities)
+        heap._elements = elements
+        heap.D = branching_factor
+        for index in range(heap.first_leaf_index() - 1, -1, -1):
+            heap._push_down(index)
+        return heap
+
+    def heapify_numpy(self, elements: List[Any], priorities: List[float]) -> None:
+        """Initializes the heap with a list of elements and priorities, like `_heapify`, but using NumPy to vectorize
+        the construction. The usual bottom-up construction is performed one level at a time, starting from the last
+        level of inner nodes: the sub-heaps rooted at the same level are disjoint, so all their roots can be pushed
+        down at the same time, with each step of their descent being a handful of NumPy operations over the
+        whole level. Elements are only shuffled (once) at the end, using the final permutation of the indices.
+        The resulting heap is the same as the one built by `_heapify`.
+        For small inputs, or if NumPy is not available, it falls back to `_heapify`.
+
+        Args:
+            elements: The list of elements to add to the heap.
+            priorities: The priorities for those elements (in the same order they are presented).
+        """
+        if len(elements) != len(priorities):
+            raise ValueError(f'The length of the elements list ({len(elements)})'
+                             f' must match the length of the priorities list ({len(priorities)}).')
+        n = len(priorities)
+        if np is None or n < DWayHeap.NumpyHeapifyThreshold:
+            self._heapify(elements, priorities)
+            return
+
+        D = self.D
+        heap_priorities = np.array(priorities, dtype=np.float64)
+        # positions[i] is the index, in `elements`, of the element currently at position i in the heap
+        positions = np.arange(n)
+        last_inner_node_index = (n - 2) // D
+        children_offsets = np.arange(D)
+
+        # Indices of the first node of each level
+        levels_start = [0]
+        while levels_start[-1] <= last_inner_node_index:
+            levels_start.append(levels_start[-1] * D + 1)
+
+        for level_start, next_level_start in zip(reversed(levels_start[:-1]), reversed(levels_start[1:])):
+            current = np.arange(level_start, min(next_level_start, last_inner_node_index + 1))
+            while current.size > 0:
+                children = (current * D + 1)[:, None] + children_offsets
+                children_priorities = np.where(children < n, heap_priorities[np.minimum(children, n - 1)], -np.inf)
+                # argmax returns the left-most child among those with the highest priority, like `_push_down`
+                best = children_priorities.argmax(axis=1)
+                rows = np.arange(current.size)
+                child_index = children[rows, best]
+                to_swap = children_priorities[rows, best] > heap_priorities[current]
+                current, child_index = current[to_swap], child_index[to_swap]
+
+                heap_priorities[current], heap_priorities[child_index] = \
+                    heap_priorities[child_index], heap_priorities[current]
+                positions[current], positions[child_index] = positions[child_index], positions[current]
+
+                current = child_index[child_index <= last_inner_node_index]
+
+        self._priorities = array('d', heap_priorities.tobytes())
+        self._elements = [elements[i] for i in positions.tolist()]
+
     def is_empty(self) -> bool:
         """Checks if the heap is empty.
 
@@ -199,10 +288,12 @@ class DWayHeap(object):
         if self.is_empty():
             raise RuntimeError('Method top called on an empty heap.')
         if len(self) == 1:
-            element = self._pairs.pop()[1]
+            self._priorities.pop()
+            element = self._elements.pop()
         else:
-            element = self._pairs[0][1]
-            self._pairs[0] = self._pairs.pop()
+            element = self._elements[0]
+            self._priorities[0] = self._priorities.pop()
+            self._elements[0] = self._elements.pop()
             self._push_down(0)
 
         return element
@@ -215,7 +306,7 @@ class DWayHeap(object):
         """
         if self.is_empty():
             raise RuntimeError('Method peek called on an empty heap.')
-        return self._pairs[0][1]
+        return self._elements[0]
 
     def insert(self, element: Any, priority: float) -> None:
         """Add a new element/priority pair to the heap
@@ -224,5 +315,6 @@ class DWayHeap(object):
             element: The new element to add.
             priority: The priority associated with the new element
         """
-        self._pairs.append((priority, element))
-        self._bubble_up(len(self._pairs) - 1)
\ No newline at end of file
+        self._priorities.append(priority)
+        self._elements.append(element)
+        self._bubble_up(len(self._priorities) - 1)
\ No newline at end of file
@@ -1,75 +1,105 @@
 import collections
-from typing import Dict, List, Optional
+import heapq
+from typing import Dict, Optional, Type, Union
 from mlarocca.datastructures.heap.dway_heap import DWayHeap
 
+try:
+    # Optional: the same d-way heap, compiled with Cython. It is not built automatically: see
+    # `heap/_dway_heap_cy.pyx` for how to build it; when it's missing, the pure-Python `DWayHeap` is used
+    from mlarocca.datastructures.heap._dway_heap_cy import DWayHeapC
+except ImportError:
+    DWayHeapC = None
+
+# The d-way heap used by default to build Huffman trees: the compiled one, when available
+_DEFAULT_HEAP_CLASS = DWayHeapC if DWayHeapC is not None else DWayHeap
+
 
 class HuffmanNode(object):
-    def __init__(self, symbols: List[str], priority: float, left: Optional['HuffmanNode'] = None,
+    def __init__(self, symbol: Optional[str], priority: float, left: Optional['HuffmanNode'] = None,
                  right: Optional['HuffmanNode'] = None) -> None:
-        self._symbols = symbols
+        """Constructor: leaves hold a single symbol and no children, while inner nodes have two children, and no
+        symbol (their symbols are those in the leaves of their subtree, but there is no need to store them).
+
+        Args:
+            symbol: The symbol for a leaf, None for an inner node.
+            priority: The priority of the node (for a leaf, the frequency of its symbol).
+            left: The left child, for inner nodes.
+            right: The right child, for inner nodes.
+        """
+        self._symbol = symbol
         self._priority = priority
         self._left = left
         self._right = right
 
     def __repr__(self):
-        return f'({self._symbols}, {self._priority})'
+        return f'({self._symbol}, {self._priority})'
 
     def __str__(self) -> str:
         return f'{repr(self)} -> ({self._left} | {self._right})'
 
-    def symbols(self) -> List[str]:
-        return self._symbols
+    def is_leaf(self) -> bool:
+        return self._left is None and self._right is None
+
+    def symbol(self) -> Optional[str]:
+        return self._symbol
 
     def priority(self) -> float:
         return self._priority
 
-    @staticmethod
-    def encode_left_path(inner_path) -> str:
-        return f'0{inner_path}'
-
-    @staticmethod
-    def encode_right_path(inner_path) -> str:
-        return f'1{inner_path}'
-
     def _validate(self) -> bool:
-        left_symbols = self._left.symbols() if self._left else []
-        right_symbols = self._right.symbols() if self._right else []
-
-        left_priority = self._left.priority() if self._left else 0.
-        right_priority = self._right.priority() if self._right else 0.
-
-        if self.symbols() != left_symbols + right_symbols:
-            return False
-
-        if self.priority() != left_priority + right_priority:
-            return False
-
+        # The tree is traversed iteratively, like in `tree_encoding`, so that deep trees can be validated as well
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.is_leaf():
+                if node._symbol is None:
+                    return False
+                continue
+
+            # Inner nodes must have exactly two children, and no symbol
+            if node._left is None or node._right is None or node._symbol is not None:
+                return False
+
+            if node.priority() != node._left.priority() + node._right.priority():
+                return False
+
+            stack.append(node._right)
+            stack.append(node._left)
         return True
 
     def tree_encoding(self) -> Dict[str, str]:
-        left_encoding_table = {} if self._left is None else self._left.tree_encoding()
-        right_encoding_table = {} if self._right is None else self._right.tree_encoding()
+        """Computes the encoding for each symbol in the (sub)tree rooted at this node, as a string of '0's and '1's.
+        A single buffer is shared for the whole traversal, holding the path from this node to the current one:
+        only when a leaf is reached, the path is copied into a string.
 
+        Returns:
+            A dictionary with the string representation of the binary code for each symbol.
+        """
         encoding_table = {}
-
-        for key, path in left_encoding_table.items():
-            encoding_table[key] = HuffmanNode.encode_left_path(path)
-
-        for key, path in right_encoding_table.items():
-            encoding_table[key] = HuffmanNode.encode_right_path(path)
-
-        if len(self._symbols) == 1:
-            encoding_table[self.symbols()[0]] = ""
-
+        path = bytearray()
+        # Each entry holds a node, its depth, and the last step (b'0' or b'1') of the path to it
+        stack = [(self, 0, 0)]
+        while stack:
+            node, depth, step = stack.pop()
+            if depth > 0:
+                # The first depth - 1 steps in the buffer are the path to this node's parent
+                del path[depth - 1:]
+                path.append(step)
+            if node.is_leaf():
+                encoding_table[node._symbol] = path.decode('ascii')
+            else:
+                stack.append((node._right, depth + 1, ord('1')))
+                stack.append((node._left, depth + 1, ord('0')))
         return encoding_table
 
 
-def _create_frequency_table(text: str) -> collections.Counter:
-    """Given a text (a string), creates a dictionary with chars/number of occurrences."""
+def _create_frequency_table(text: Union[str, bytes]) -> collections.Counter:
+    """Given a text (a string, or raw bytes), creates a dictionary with chars (or byte values)/number of occurrences."""
     return collections.Counter(text)
 
 
-def _frequency_table_to_heap(ft: collections.Counter, branching_factor: int = 2) -> DWayHeap:
+def _frequency_table_to_heap(ft: collections.Counter, branching_factor: int = 2,
+                             heap_class: Type = _DEFAULT_HEAP_CLASS) -> DWayHeap:
     """Takes a frequency table and creates a heap whose elements are nodes of the Huffman tree,
     with one node per unique character in the FT; for each element the priority associated to it is
     the frequency of the corresponding character.
@@ -77,6 +107,8 @@ def _frequency_table_to_heap(ft: collections.Counter, branching_factor: int = 2)
     Args:
         ft: The frequency table, with char/number of occurrences (or document frequency) pairs.
         branching_factor: The branching factor for the d-ary heap that will be created.
+        heap_class: The class of the heap to create: `DWayHeap`, or `DWayHeapC` (the default, if the Cython
+                    extension is built).
 
     Returns:
         A d-ary heap containing one entry per unique character in the original text;
@@ -86,7 +118,7 @@ def _frequency_table_to_heap(ft: collections.Counter, branching_factor: int = 2)
     # Create a node for each character; use the inverse of the frequency because DWayHeap is a max heap
     priorities = list(map(lambda p: -p, priorities))
     elements = list(map(lambda c: HuffmanNode(c, -ft[c]), characters))
-    return DWayHeap(elements=elements, priorities=priorities, branching_factor=branching_factor)
+    return heap_class(elements=elements, priorities=priorities, branching_factor=branching_factor)
 
 
 def _heap_to_tree(heap: DWayHeap) -> HuffmanNode:
@@ -104,20 +136,52 @@ def _heap_to_tree(heap: DWayHeap) -> HuffmanNode:
         right: HuffmanNode = heap.top()
         left: HuffmanNode = heap.top()
 
-        # Computes the symbols list and priority for the node merging left and right subtrees
-        symbols: List[str] = left.symbols() + right.symbols()
+        # Computes the priority for the node merging left and right subtrees
         priority: float = left.priority() + right.priority()
 
-        heap.insert(HuffmanNode(symbols, priority, left, right), priority)
+        heap.insert(HuffmanNode(None, priority, left, right), priority)
 
     return heap.top()
 
 
-def create_encoding(text: str, branching_factor: int) -> Dict[str, str]:
+def _frequency_table_to_tree(ft: collections.Counter) -> HuffmanNode:
+    """Builds a Huffman encoding tree from a frequency table, like `_heap_to_tree`, but using `heapq`'s binary
+       (min-)heap, implemented in C, instead of a `DWayHeap`.
+       Each entry of the heap also holds a sequence number, to break ties between equal frequencies without
+       ever comparing the nodes themselves.
+
+    Args:
+        ft: The frequency table, with char/number of occurrences (or document frequency) pairs.
+
+    Returns:
+        The root of the Huffman encoding tree.
+    """
+    heap = [(frequency, i, HuffmanNode(c, frequency)) for i, (c, frequency) in enumerate(ft.items())]
+    heapq.heapify(heap)
+    next_index = len(heap)
+    while len(heap) > 1:
+        # Gets the two entries with the lowest frequencies
+        right_frequency, _, right = heapq.heappop(heap)
+        left_frequency, _, left = heapq.heappop(heap)
+
+        priority = left_frequency + right_frequency
+        heapq.heappush(heap, (priority, next_index, HuffmanNode(None, priority, left, right)))
+        next_index += 1
+
+    return heap[0][2]
+
+
+def create_encoding(text: Union[str, bytes], branching_factor: Optional[int] = None,
+                    heap_class: Type = _DEFAULT_HEAP_CLASS) -> Dict[str, str]:
     """Create a Huffman encoding for a text.
 
     Args:
-        text: The input string to be compressed.
+        text: The input string to be compressed. Binary data can be passed directly as `bytes`, in which case
+              the symbols in the output are the byte values (ints in [0, 255]).
+        branching_factor: The branching factor for the d-ary heap used to build the Huffman tree.
+                          If None, `heapq`'s binary heap is used instead.
+        heap_class: The class of the d-ary heap, when `branching_factor` is not None: `DWayHeap`, or `DWayHeapC`
+                    (the default, if the Cython extension is built).
 
     Returns:
         A dictionary with an entry for each unique character in the text.
@@ -125,4 +189,7 @@ def create_encoding(text: str, branching_factor: int) -> Dict[str, str]:
         So, if ('a', '101') is in the output dictionary, to compress the original text one should
         replace all occurrences of 'a' in the text with the 3 bits 101 (using binary arithmetic).
     """
-    return _heap_to_tree(_frequency_table_to_heap(_create_frequency_table(text), branching_factor)).tree_encoding()
\ No newline at end of file
+    ft = _create_frequency_table(text)
+    if branching_factor is None:
+        return _frequency_table_to_tree(ft).tree_encoding()
+    return _heap_to_tree(_frequency_table_to_heap(ft, branching_factor, heap_class)).tree_encoding()
\ No newline at end of file
@@ -0,0 +1,20 @@
+import unittest
+
+from mlarocca.datastructures.clustering.dbscan import dbscan, NOISE
+
+
+class DbscanTest(unittest.TestCase):
+    Points = [(0., 0.), (0., 1.), (1., 0.), (0.5, 0.5), (5., 5.), (5., 6.), (6., 5.), (20., 20.)]
+
+    def test_dbscan(self):
+        self.assertEqual([1, 1, 1, 1, 2, 2, 2, NOISE], dbscan(DbscanTest.Points, 1.5, 3))
+
+    def test_dbscan_all_noise(self):
+        self.assertEqual([NOISE] * len(DbscanTest.Points), dbscan(DbscanTest.Points, 0.1, 2))
+
+    def test_dbscan_single_cluster(self):
+        self.assertEqual([1] * len(DbscanTest.Points), dbscan(DbscanTest.Points, 30., 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,11 @@ import random
 
 from mlarocca.datastructures.heap.dway_heap import DWayHeap
 
+try:
+    from mlarocca.datastructures.heap._dway_heap_cy import DWayHeapC
+except ImportError:
+    DWayHeapC = None
+
 BRANCHING_FACTORS_TO_TEST = [2, 3, 4, 5, 6]
 
 
@@ -37,6 +42,36 @@ class HeapTest(unittest.TestCase):
             self.assertEqual(size, len(heap))
             self.assertTrue(heap._validate())
 
+    def test_heapify_in_place(self):
+        for b in BRANCHING_FACTORS_TO_TEST:
+            for size in [0, 1, 4 + random.randint(0, 100)]:
+                elements = list(range(size))
+                priorities = [random.random() for _ in range(size)]
+                expected = DWayHeap(elements=elements, priorities=priorities, branching_factor=b)
+                heap = DWayHeap.heapify_in_place(elements, priorities, b)
+
+                self.assertEqual(size, len(heap))
+                self.assertTrue(heap._validate())
+                # The list of elements is used as the heap's storage
+                self.assertIs(elements, heap._elements)
+                self.assertEqual(list(expected._priorities), list(heap._priorities))
+                self.assertEqual(expected._elements, heap._elements)
+
+    def test_heapify_numpy(self):
+        for b in BRANCHING_FACTORS_TO_TEST:
+            for size in [10, DWayHeap.NumpyHeapifyThreshold + random.randint(0, 2000)]:
+                elements = list(range(size))
+                priorities = [random.random() for _ in range(size)]
+                heap = DWayHeap(branching_factor=b)
+                heap.heapify_numpy(elements, priorities)
+
+                self.assertEqual(size, len(heap))
+                self.assertTrue(heap._validate())
+                # Must build the exact same heap as the scalar construction
+                expected = DWayHeap(elements=elements, priorities=priorities, branching_factor=b)
+                self.assertEqual(list(expected._priorities), list(heap._priorities))
+                self.assertEqual(expected._elements, heap._elements)
+
     def test_clear(self):
         for b in BRANCHING_FACTORS_TO_TEST:
             heap = DWayHeap(branching_factor=b)
@@ -83,5 +118,62 @@ class HeapTest(unittest.TestCase):
                 heap.top()
 
 
+@unittest.skipIf(DWayHeapC is None, 'The Cython extension _dway_heap_cy is not built')
+class HeapCTest(unittest.TestCase):
+    def test_same_as_dway_heap(self):
+        for b in BRANCHING_FACTORS_TO_TEST:
+            size = random.randint(0, 100)
+            elements = list(range(size))
+            priorities = [random.randint(0, 20) for _ in range(size)]
+            heap = DWayHeap(elements, priorities, b)
+            heap_c = DWayHeapC(elements, priorities, b)
+            self.assertTrue(heap_c._validate())
+
+            for i in range(size, size + 1000):
+                if heap.is_empty() or random.random() < 0.5:
+                    priority = random.randint(0, 20)
+                    heap.insert(i, priority)
+                    heap_c.insert(i, priority)
+                else:
+                    self.assertEqual(heap.peek(), heap_c.peek())
+                    self.assertEqual(heap.top(), heap_c.top())
+                self.assertEqual(len(heap), len(heap_c))
+            self.assertTrue(heap_c._validate())
+
+            while not heap.is_empty():
+                self.assertEqual(heap.top(), heap_c.top())
+            with self.assertRaises(RuntimeError):
+                heap_c.top()
+
+    def test_small_sizes(self):
+        for b in BRANCHING_FACTORS_TO_TEST:
+            heap_c = DWayHeapC(['a'], [-1e300], b)
+            self.assertEqual(1, len(heap_c))
+            self.assertTrue(heap_c._validate())
+            self.assertEqual('a', heap_c.top())
+            self.assertTrue(heap_c.is_empty())
+
+            heap_c = DWayHeapC(['a', 'b'], [1., 2.], b)
+            self.assertTrue(heap_c._validate())
+            self.assertEqual('b', heap_c.top())
+            self.assertEqual('a', heap_c.top())
+            self.assertTrue(heap_c.is_empty())
+
+    def test_drain_to_one_element(self):
+        for b in BRANCHING_FACTORS_TO_TEST:
+            size = 10 + random.randint(0, 20)
+            priorities = [random.random() for _ in range(size)]
+            heap_c = DWayHeapC(list(range(size)), priorities, b)
+            while len(heap_c) > 1:
+                heap_c.top()
+                self.assertTrue(heap_c._validate())
+            # Inserting into, and popping from, a single-element heap
+            heap_c.insert(size, 2.)
+            self.assertEqual(size, heap_c.top())
+            self.assertEqual(1, len(heap_c))
+            heap_c.top()
+            self.assertTrue(heap_c.is_empty())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,128 +1,231 @@
+"""Profiling of DWayHeap's methods, for a range of branching factors.
+
+Usage (from this folder, with the `Python` folder in PYTHONPATH):
+    python heap_profile.py [isolation|heapify|interaction|all] [--branching-factors B [B ...]] [--runs RUNS]
+                           [--output OUTPUT] [--seed SEED] [--workers WORKERS] [--memory]
+"""
+import argparse
 import cProfile
+import csv
 import pstats
 import random
-import unittest
-
-from typing import List, Tuple
 
-from mlarocca.datastructures.heap.dway_heap import DWayHeap
+import numpy as np
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from time import perf_counter_ns
+from typing import Callable, Iterable, List, Optional, Tuple
 
-class HeapProfile(unittest.TestCase):
-    BranchingFactors = range(2, 21)
-    Runs = 5000
-    OutputFileName = 'data/stats_heap.csv'
-    OutputFileNameHeapify = 'data/stats_heapify.csv'
-    OutputFileNameMixed = 'data/stats_heap_mixed.csv'
-
-    @staticmethod
-    def write_header(f) -> None:
-        """Write the header of the output csv file for stats"""
-        f.write('test_case,branching_factor,method_name,total_time,cumulative_time,per_call_time\n')
-
-    @staticmethod
-    def write_row(f, test_case: str, branching_factor: int, method_name: str, total_time: float,
-                  cumulative_time: float, per_call_time: float) -> None:
-        """Add a row of data to the stats csv file"""
-        f.write(f'{test_case},{branching_factor},{method_name},{total_time},{cumulative_time},{per_call_time}\n')
-
-    @staticmethod
-    def get_running_times(st: pstats.Stats, method_name: str) -> List[Tuple[str, float]]:
-        ps = st.strip_dirs().stats
-
-        # Takes methods frequency_table_to_heap, heap_to_tree, and _heapify
-        def is_heap_method(k):
-            return method_name in k[2]
-
-        keys = list(filter(is_heap_method, ps.keys()))
-        # cc, nc, tt, ct, callers = ps[key]
-        #  ps[key][2] -> tt -> total time
-        #  ps[key][3] -> ct -> cumulative time
-        return [(key[2], ps[key][2], ps[key][3], ps[key][3] / ps[key][1]) for key in keys]
-
-    def test_profile_heap_methods_isolation(self) -> None:
-        with open(HeapProfile.OutputFileName, 'w') as f:
-            HeapProfile.write_header(f)
-            for b in HeapProfile.BranchingFactors:
-                heap = DWayHeap(branching_factor=b)
-                for _ in range(HeapProfile.Runs):
-                    pro = cProfile.Profile()
-                    pro.runcall(heap.insert, random.random(), random.random())
-                    st = pstats.Stats(pro)
-                    # st.strip_dirs().sort_stats('cumulative').print_stats(20)
-
-                    for method_name, total_time, cumulative_time, per_call_time in \
-                            HeapProfile.get_running_times(st, 'insert'):
-                        HeapProfile.write_row(f, 'heap', b, method_name, total_time, cumulative_time, per_call_time)
-
-                    for method_name, total_time, cumulative_time, per_call_time in \
-                            HeapProfile.get_running_times(st, '_bubble_up'):
-                        HeapProfile.write_row(f, 'heap', b, method_name, total_time, cumulative_time, per_call_time)
-
-                while not heap.is_empty():
-                    pro = cProfile.Profile()
-                    pro.runcall(heap.top)
-                    st = pstats.Stats(pro)
-                    # st.strip_dirs().sort_stats('cumulative').print_stats(20)
-
-                    for method_name, total_time, cumulative_time, per_call_time in \
-                            HeapProfile.get_running_times(st, 'top'):
-                        HeapProfile.write_row(f, 'heap', b, method_name, total_time, cumulative_time, per_call_time)
-                    for method_name, total_time, cumulative_time, per_call_time in \
-                            HeapProfile.get_running_times(st, '_push_down'):
-                        HeapProfile.write_row(f, 'heap', b, method_name, total_time, cumulative_time, per_call_time)
-
-    def test_profile_heapify(self) -> None:
-        with open(HeapProfile.OutputFileNameHeapify, 'w') as f:
-            HeapProfile.write_header(f)
-            for b in HeapProfile.BranchingFactors:
-                for _ in range(HeapProfile.Runs):
-                    n = 1000 + random.randint(0, 1000)
-                    elements = [random.random() for _ in range(n)]
-                    pro = cProfile.Profile()
-                    pro.runcall(DWayHeap, elements, elements, b)
-                    st = pstats.Stats(pro)
-                    # st.strip_dirs().sort_stats('cumulative').print_stats(20)
-
-                    for method_name, total_time, cumulative_time, per_call_time in \
-                            HeapProfile.get_running_times(st, '_heapify'):
-                        HeapProfile.write_row(f, 'heap', b, method_name, total_time, cumulative_time, per_call_time)
-
-                    for method_name, total_time, cumulative_time, per_call_time in \
-                            HeapProfile.get_running_times(st, '_push_down'):
-                        HeapProfile.write_row(f, 'heap', b, method_name, total_time, cumulative_time, per_call_time)
-
-    def test_profile_heap_methods_interaction(self) -> None:
-        with open(HeapProfile.OutputFileNameMixed, 'w') as f:
-            HeapProfile.write_header(f)
-            for b in HeapProfile.BranchingFactors:
-                heap = DWayHeap(branching_factor=b)
-                for _ in range(HeapProfile.Runs):
-                    pro = cProfile.Profile()
-                    pro.runcall(heap.insert, random.random(), random.random())
-
-                    while not heap.is_empty() and random.choice([True, False]):
-                        pro.runcall(heap.top)
-
-                    st = pstats.Stats(pro)
-                    # st.strip_dirs().sort_stats('cumulative').print_stats(20)
-
-                    for method_name, total_time, cumulative_time, per_call_time in \
-                            HeapProfile.get_running_times(st, 'insert'):
-                        HeapProfile.write_row(f, 'heap', b, method_name, total_time, cumulative_time, per_call_time)
-
-                    for method_name, total_time, cumulative_time, per_call_time in \
-                            HeapProfile.get_running_times(st, '_bubble_up'):
-                        HeapProfile.write_row(f, 'heap', b, method_name, total_time, cumulative_time, per_call_time)
-
-                    for method_name, total_time, cumulative_time, per_call_time in \
-                            HeapProfile.get_running_times(st, 'top'):
-                        HeapProfile.write_row(f, 'heap', b, method_name, total_time, cumulative_time, per_call_time)
-
-                    for method_name, total_time, cumulative_time, per_call_time in \
-                            HeapProfile.get_running_times(st, '_push_down'):
-                        HeapProfile.write_row(f, 'heap', b, method_name, total_time, cumulative_time, per_call_time)
+from mlarocca.datastructures.heap.dway_heap import DWayHeap
+from mlarocca.tests.profile_utils import get_running_times, trace_memory, write_header
+
+BRANCHING_FACTORS = range(2, 21)
+RUNS = 5000
+# The default seed for the random generators, so that runs of the profile are comparable
+SEED = 42
+OUTPUT_FILE_NAME = 'data/stats_heap.csv'
+OUTPUT_FILE_NAME_HEAPIFY = 'data/stats_heapify.csv'
+OUTPUT_FILE_NAME_MIXED = 'data/stats_heap_mixed.csv'
+# The internal methods whose running times can only be measured with cProfile, in a single calibration run;
+# public methods are instead timed directly, with perf_counter_ns, which has a much lower overhead
+CALIBRATED_METHODS = frozenset(('_bubble_up', '_push_down'))
+NS_PER_S = 1e9
+HEADER = ('test_case', 'branching_factor', 'method_name', 'total_time', 'cumulative_time', 'per_call_time')
+
+# A row of stats: test_case, branching_factor, method_name, total_time, cumulative_time, per_call_time
+Row = Tuple[str, int, str, float, float, float]
+
+
+def add_timed_row(rows: List[Row], branching_factor: int, method_name: str, elapsed_ns: int, calls: int) -> None:
+    """Add a row of data, for a method timed directly, to a batch of rows for the stats csv file.
+    Since callees are not told apart, total and cumulative time are the same."""
+    elapsed = elapsed_ns / NS_PER_S
+    rows.append(('heap', branching_factor, method_name, elapsed, elapsed, elapsed / calls if calls > 0 else 0.))
+
+
+def calibrate(rows: List[Row], b: int, func: Callable, *args) -> None:
+    """Runs `func(*args)` once with cProfile, and adds a row to the batch for each calibrated method it calls."""
+    pro = cProfile.Profile()
+    pro.runcall(func, *args)
+    st = pstats.Stats(pro)
+    # st.strip_dirs().sort_stats('cumulative').print_stats(20)
+
+    rows.extend(('heap', b, *running_times) for running_times in get_running_times(st, CALIBRATED_METHODS))
+
+
+def random_pairs(rng: np.random.Generator, n: int) -> List[List[float]]:
+    """Generates, all at once, `n` random (element, priority) pairs."""
+    return rng.random((n, 2)).tolist()
+
+
+def insert_all(heap: DWayHeap, pairs: List[List[float]]) -> None:
+    """Inserts all the (element, priority) pairs into the heap."""
+    for element, priority in pairs:
+        heap.insert(element, priority)
+
+
+def remove_all_elements(heap: DWayHeap) -> None:
+    """Removes all elements from the heap, one by one, by calling `top`."""
+    while not heap.is_empty():
+        heap.top()
+
+
+def insert_and_remove_random_elements(heap: DWayHeap, pairs: List[List[float]]) -> Tuple[int, int, int, int]:
+    """Inserts all the pairs into the heap; after each insertion, keeps calling `top` until either
+    the heap is empty, or a coin toss comes out tails.
+
+    Returns:
+        The time spent in `insert` (in nanoseconds) and the number of calls to it,
+        followed by the same two values for `top`.
+    """
+    insert_ns = top_ns = top_calls = 0
+    # All the coin tosses are drawn at once, as the bits of a single random integer: since there can't be more calls
+    # to `top` than insertions, at most two bits are consumed per insertion (one per call to `top`, plus one after)
+    coin_bits = random.getrandbits(2 * len(pairs))
+    for element, priority in pairs:
+        t0 = perf_counter_ns()
+        heap.insert(element, priority)
+        insert_ns += perf_counter_ns() - t0
+        while not heap.is_empty() and coin_bits & 1:
+            coin_bits >>= 1
+            t0 = perf_counter_ns()
+            heap.top()
+            top_ns += perf_counter_ns() - t0
+            top_calls += 1
+        coin_bits >>= 1
+    return insert_ns, len(pairs), top_ns, top_calls
+
+
+def heap_methods_isolation_one_b(b: int, runs: int, seed: Optional[int]) -> List[Row]:
+    """Profiles, for a single branching factor, `runs` insertions followed by the removal of all elements.
+
+    Returns:
+        The stats, as a batch of csv rows.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    pairs = random_pairs(rng, runs)
+
+    heap = DWayHeap(branching_factor=b)
+    calibrate(rows, b, insert_all, heap, pairs)
+    calibrate(rows, b, remove_all_elements, heap)
+
+    heap = DWayHeap(branching_factor=b)
+    t0 = perf_counter_ns()
+    for element, priority in pairs:
+        heap.insert(element, priority)
+    add_timed_row(rows, b, 'insert', perf_counter_ns() - t0, runs)
+
+    t0 = perf_counter_ns()
+    for _ in range(runs):
+        heap.top()
+    add_timed_row(rows, b, 'top', perf_counter_ns() - t0, runs)
+    return rows
+
+
+def heapify_one_b(b: int, runs: int, seed: Optional[int]) -> List[Row]:
+    """Profiles, for a single branching factor, the creation of `runs` heaps from lists of elements with random
+    priorities.
+
+    Returns:
+        The stats, as a batch of csv rows.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    n = int(rng.integers(1000, 2001))
+    calibrate(rows, b, DWayHeap.heapify_in_place, list(range(n)), rng.random(n).tolist(), b)
+
+    for n in rng.integers(1000, 2001, size=runs).tolist():
+        elements = list(range(n))
+        priorities = rng.random(n).tolist()
+        # heapify_in_place skips the constructor's validation and copy of the elements, that would add noise
+        t0 = perf_counter_ns()
+        DWayHeap.heapify_in_place(elements, priorities, b)
+        add_timed_row(rows, b, 'heapify_in_place', perf_counter_ns() - t0, 1)
+    return rows
+
+
+def heap_methods_interaction_one_b(b: int, runs: int, seed: Optional[int]) -> List[Row]:
+    """Profiles, for a single branching factor, `runs` insertions interleaved with random removals.
+
+    Returns:
+        The stats, as a batch of csv rows.
+    """
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    rows = []
+    pairs = random_pairs(rng, runs)
+    calibrate(rows, b, insert_and_remove_random_elements, DWayHeap(branching_factor=b), pairs)
+
+    insert_ns, insert_calls, top_ns, top_calls = insert_and_remove_random_elements(DWayHeap(branching_factor=b), pairs)
+    add_timed_row(rows, b, 'insert', insert_ns, insert_calls)
+    add_timed_row(rows, b, 'top', top_ns, top_calls)
+    return rows
+
+
+def sweep_branching_factors(run_one_b: Callable[[int, int, Optional[int]], List[Row]], branching_factors: Iterable[int],
+                            runs: int, output_file_name: str, seed: Optional[int] = None,
+                            workers: Optional[int] = None, memory: bool = False) -> None:
+    """Runs a profile for each branching factor, in parallel, and writes all the stats to a single csv file.
+
+    The runs for different branching factors are independent and CPU-bound, so each one is executed
+    in a separate process; the batch of csv rows each process returns is then written, all at once,
+    in the order of `branching_factors`.
+
+    Args:
+        run_one_b: The function profiling a single branching factor: it must be defined at module level
+                   (to be sent to the worker processes), and it must return the stats as a batch of csv rows.
+        branching_factors: The branching factors to profile.
+        runs: The number of runs for each branching factor.
+        output_file_name: The csv file where stats are written.
+        seed: If not None, the random generators for branching factor `b` are seeded with `seed + b`,
+              to make the profile reproducible.
+        workers: The maximum number of worker processes (default: the number of CPUs).
+        memory: If True, memory allocations are also traced, and the peak memory used while profiling each
+                branching factor is added to its rows, as an extra column. Since tracing slows execution down,
+                running times are then less accurate.
+    """
+    if memory:
+        run_one_b = partial(trace_memory, run_one_b)
+    branching_factors = list(branching_factors)
+    seeds = [None if seed is None else seed + b for b in branching_factors]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(run_one_b, branching_factors, [runs] * len(branching_factors), seeds)
+        with open(output_file_name, 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            write_header(writer, HEADER, memory)
+            for rows in results:
+                writer.writerows(rows)
+
+
+PROFILES = {
+    'isolation': (heap_methods_isolation_one_b, OUTPUT_FILE_NAME),
+    'heapify': (heapify_one_b, OUTPUT_FILE_NAME_HEAPIFY),
+    'interaction': (heap_methods_interaction_one_b, OUTPUT_FILE_NAME_MIXED),
+}
 
 
 if __name__ == '__main__':
-    unittest.main()
+    parser = argparse.ArgumentParser(description="Profiles DWayHeap's methods for a range of branching factors.")
+    parser.add_argument('profile', nargs='?', choices=[*PROFILES, 'all'], default='all',
+                        help='The profile to run (default: all of them).')
+    parser.add_argument('--branching-factors', type=int, nargs='+', default=list(BRANCHING_FACTORS),
+                        help=f'The branching factors to profile (default: {BRANCHING_FACTORS}).')
+    parser.add_argument('--runs', type=int, default=RUNS, help=f'The number of runs per branching factor '
+                                                               f'(default: {RUNS}).')
+    parser.add_argument('--output', help='The output csv file (default: a different file for each profile). '
+                                         'Can only be used when running a single profile.')
+    parser.add_argument('--seed', type=int, default=SEED, help=f'The seed for the random generators '
+                                                               f'(default: {SEED}).')
+    parser.add_argument('--workers', type=int, help='The number of worker processes (default: the number of CPUs).')
+    parser.add_argument('--memory', action='store_true', help='Also trace memory allocations, and add the peak '
+                                                              'memory to the stats (slows the profile down).')
+    args = parser.parse_args()
+    if args.output is not None and args.profile == 'all':
+        parser.error('--output can only be used when running a single profile')
+
+    for profile_name in (PROFILES if args.profile == 'all' else [args.profile]):
+        run_one_b, default_output_file_name = PROFILES[profile_name]
+        sweep_branching_factors(run_one_b, args.branching_factors, args.runs, args.output or default_output_file_name,
+                                args.seed, args.workers, args.memory)
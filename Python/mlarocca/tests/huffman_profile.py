@@ -1,11 +1,20 @@
-import base64
+"""Profiling of Huffman's encoding (and of the DWayHeap it uses), for a range of branching factors.
+
+Usage (from this folder, with the `Python` folder in PYTHONPATH):
+    python huffman_profile.py [--test-cases {text,image} [...]] [--branching-factors B [B ...]] [--runs RUNS]
+                              [--output OUTPUT] [--workers WORKERS] [--memory]
+"""
+import argparse
 import cProfile
+import csv
 import pstats
-import unittest
 
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 from mlarocca.datastructures.huffman import huffman
+from mlarocca.tests.profile_utils import get_running_times, trace_memory, write_header
 
 
 def read_text(file_name: str) -> str:
@@ -14,69 +23,95 @@ def read_text(file_name: str) -> str:
     return text
 
 
-def read_image(file_name: str) -> str:
+def read_image(file_name: str) -> bytes:
     with open(file_name, 'rb') as f:
-        # Read an image bytes and encodes them using base64 encoding, to treat it as text
-        text = str(base64.b64encode(f.read()))
-    return text
-
-
-class HuffmanProfile(unittest.TestCase):
-    TestCases = {
-        'text': (['data/alice.txt', 'data/candide.txt',
-                  'data/gullivers_travels.txt'], read_text, 1000),
-        'image': (['data/best_selling.bmp'], read_image, 200)
-    }
-    BranchingFactors = range(2, 24)
-    OutputFileName = 'data/stats_huffman.csv'
-
-    @staticmethod
-    def write_header(f) -> None:
-        """Write the header of the output csv file for stats"""
-        f.write('test_case,branching_factor,method_name,total_time,cumulative_time,per_call_time\n')
-
-    @staticmethod
-    def write_row(f, test_case: str, branching_factor: int, method_name: str, total_time: float,
-                  cumulative_time: float, per_call_time: float) -> None:
-        """Add a row of data to the stats csv file"""
-        f.write(f'{test_case},{branching_factor},{method_name},{total_time},{cumulative_time},{per_call_time}\n')
-
-    @staticmethod
-    def get_running_times(st: pstats.Stats) -> List[Tuple[str, float, float, float]]:
-        ps = st.strip_dirs().stats
-
-        # Takes methods frequency_table_to_heap, heap_to_tree, and _heapify
-        def is_heap_method(k):
-            return 'heap' in k[2] or 'create_encoding' in k[2] or \
-                   ('dway_heap.py' in k and ('top' in k[2] or 'insert' in k[2] or
-                                             '_push_down' in k[2] or '_bubble_up' in k[2] or
-                                             '_highest_priority_child_index' in k[2]))
-
-        keys = list(filter(is_heap_method, ps.keys()))
-        # cc, nc, tt, ct, callers = ps[key]
-        #  ps[key][2] -> tt -> total time
-        #  ps[key][3] -> ct -> cumulative time
-        return [(key[2], ps[key][2], ps[key][3], ps[key][3] / ps[key][1]) for key in keys]
-
-    def test_profile_huffman(self) -> None:
-        with open(HuffmanProfile.OutputFileName, 'w') as f:
-            HuffmanProfile.write_header(f)
-            for test_case, (file_names, read_func, runs) in HuffmanProfile.TestCases.items():
-                file_contents = [read_func(file_name) for file_name in file_names]
-                for _ in range(runs):
-                    for b in HuffmanProfile.BranchingFactors:
-                        pro = cProfile.Profile()
-                        for file_content in file_contents:
-                            pro.runcall(huffman.create_encoding, file_content, b)
-
-                        st = pstats.Stats(pro)
-                        # st.strip_dirs().sort_stats('cumulative').print_stats(20)
-
-                        for method_name, total_time, cumulative_time, per_call_time in HuffmanProfile.get_running_times(
-                                st):
-                            HuffmanProfile.write_row(f, test_case, b, method_name, total_time, cumulative_time,
-                                                     per_call_time)
+        # Huffman's encoding works directly on the image's raw bytes (the symbols being the byte values)
+        data = f.read()
+    return data
+
+
+# For each test case: the files to encode, how to read them, and the number of runs
+TEST_CASES: Dict[str, Tuple[List[str], Callable[[str], Union[str, bytes]], int]] = {
+    'text': (['data/alice.txt', 'data/candide.txt',
+              'data/gullivers_travels.txt'], read_text, 1000),
+    'image': (['data/best_selling.bmp'], read_image, 200)
+}
+BRANCHING_FACTORS = range(2, 24)
+OUTPUT_FILE_NAME = 'data/stats_huffman.csv'
+HEADER = ('test_case', 'branching_factor', 'method_name', 'total_time', 'cumulative_time', 'per_call_time')
+
+# A row of stats: test_case, branching_factor, method_name, total_time, cumulative_time, per_call_time
+Row = Tuple[str, int, str, float, float, float]
+# Huffman's encoding and its steps using the heap, and the DWayHeap's methods they call
+TRACKED_METHODS = frozenset(('create_encoding', '_frequency_table_to_heap', '_heap_to_tree', '_heapify', 'top',
+                             'insert', '_push_down', '_bubble_up'))
+
+
+def huffman_one_b(b: int, test_case: str, file_contents: List[Union[str, bytes]], runs: int) -> List[Row]:
+    """Profiles, for a single branching factor, `runs` encodings of each of the files' contents.
+
+    Returns:
+        The stats, as a batch of csv rows.
+    """
+    rows = []
+    # A single profiler is reused (and cleared) for all runs
+    pro = cProfile.Profile()
+    for _ in range(runs):
+        pro.clear()
+        for file_content in file_contents:
+            # Always the pure-Python DWayHeap: cProfile can't see the methods of the Cython heap
+            pro.runcall(huffman.create_encoding, file_content, b, huffman.DWayHeap)
+
+        st = pstats.Stats(pro)
+        # st.strip_dirs().sort_stats('cumulative').print_stats(20)
+
+        rows.extend((test_case, b, *running_times) for running_times in get_running_times(st, TRACKED_METHODS))
+    return rows
+
+
+def profile_huffman(test_cases: Iterable[str], branching_factors: Iterable[int], runs: Optional[int],
+                    output_file_name: str, workers: Optional[int] = None, memory: bool = False) -> None:
+    """Profiles Huffman's encoding on the files for each test case.
+
+    The runs for different branching factors are independent and CPU-bound, so each branching factor
+    is profiled in a separate process, and the stats for each one are written as a single batch of rows.
+
+    Args:
+        test_cases: The names of the test cases (keys of `TEST_CASES`) to profile.
+        branching_factors: The branching factors for the heap to profile.
+        runs: The number of runs for each test case; if None, each test case's default is used.
+        output_file_name: The csv file where stats are written.
+        workers: The maximum number of worker processes (default: the number of CPUs).
+        memory: If True, memory allocations are also traced, and the peak memory used while profiling each
+                (test case, branching factor) pair is added to its rows, as an extra column. Since tracing slows
+                execution down, running times are then less accurate.
+    """
+    with open(output_file_name, 'w', newline='') as f, ProcessPoolExecutor(max_workers=workers) as executor:
+        writer = csv.writer(f, lineterminator='\n')
+        write_header(writer, HEADER, memory)
+        for test_case in test_cases:
+            file_names, read_func, test_case_runs = TEST_CASES[test_case]
+            file_contents = [read_func(file_name) for file_name in file_names]
+            run_one_b = partial(huffman_one_b, test_case=test_case, file_contents=file_contents,
+                                runs=runs or test_case_runs)
+            if memory:
+                run_one_b = partial(trace_memory, run_one_b)
+            for rows in executor.map(run_one_b, branching_factors):
+                writer.writerows(rows)
 
 
 if __name__ == '__main__':
-    unittest.main()
+    parser = argparse.ArgumentParser(description="Profiles Huffman's encoding for a range of branching factors.")
+    parser.add_argument('--test-cases', nargs='+', choices=list(TEST_CASES), default=list(TEST_CASES),
+                        help='The test cases to run (default: all of them).')
+    parser.add_argument('--branching-factors', type=int, nargs='+', default=list(BRANCHING_FACTORS),
+                        help=f'The branching factors to profile (default: {BRANCHING_FACTORS}).')
+    parser.add_argument('--runs', type=int, help="The number of runs (default: each test case's own).")
+    parser.add_argument('--output', default=OUTPUT_FILE_NAME, help=f'The output csv file '
+                                                                   f'(default: {OUTPUT_FILE_NAME}).')
+    parser.add_argument('--workers', type=int, help='The number of worker processes (default: the number of CPUs).')
+    parser.add_argument('--memory', action='store_true', help='Also trace memory allocations, and add the peak '
+                                                              'memory to the stats (slows the profile down).')
+    args = parser.parse_args()
+
+    profile_huffman(args.test_cases, args.branching_factors, args.runs, args.output, args.workers, args.memory)
@@ -10,6 +10,23 @@ class HuffmanTest(unittest.TestCase):
         self.assertEqual({'a': '0', 'b': '10', 'c': '1100', 'd': '1101', 'e': '1110', 'f': '1111'},
                          huffman.create_encoding(HuffmanTest.Text))
 
+    def test_huffman_with_dway_heap(self):
+        for b in range(2, 6):
+            self.assertEqual({'a': '0', 'b': '10', 'c': '1100', 'd': '1101', 'e': '1110', 'f': '1111'},
+                             huffman.create_encoding(HuffmanTest.Text, b, huffman.DWayHeap))
+
+    @unittest.skipIf(huffman.DWayHeapC is None, 'The Cython extension _dway_heap_cy is not built')
+    def test_huffman_with_cython_heap(self):
+        for b in range(2, 6):
+            self.assertEqual({'a': '0', 'b': '10', 'c': '1100', 'd': '1101', 'e': '1110', 'f': '1111'},
+                             huffman.create_encoding(HuffmanTest.Text, b, huffman.DWayHeapC))
+        self.assertEqual({'a': ''}, huffman.create_encoding('aaaa', 2, huffman.DWayHeapC))
+
+    def test_huffman_bytes(self):
+        self.assertEqual({ord('a'): '0', ord('b'): '10', ord('c'): '1100', ord('d'): '1101', ord('e'): '1110',
+                          ord('f'): '1111'},
+                         huffman.create_encoding(HuffmanTest.Text.encode('ascii')))
+
     def test_create_frequency_table(self):
         self.assertEqual({'a': 57, 'b': 22, 'c': 7, 'd': 6, 'e': 5, 'f': 3},
                          huffman._create_frequency_table(HuffmanTest.Text))
@@ -23,4 +40,19 @@ class HuffmanTest(unittest.TestCase):
         tree = huffman._heap_to_tree(heap)
 
         self.assertTrue(tree._validate())
-        print(tree)
\ No newline at end of file
+        print(tree)
+
+    def test_frequency_table_to_tree(self):
+        tree = huffman._frequency_table_to_tree(huffman._create_frequency_table(HuffmanTest.Text))
+
+        self.assertTrue(tree._validate())
+        self.assertEqual(len(HuffmanTest.Text), tree.priority())
+
+    def test_validate(self):
+        a, b = huffman.HuffmanNode('a', 2), huffman.HuffmanNode('b', 3)
+        self.assertTrue(a._validate())
+        self.assertTrue(huffman.HuffmanNode(None, 5, a, b)._validate())
+        self.assertFalse(huffman.HuffmanNode(None, 4, a, b)._validate())
+        self.assertFalse(huffman.HuffmanNode('c', 5, a, b)._validate())
+        self.assertFalse(huffman.HuffmanNode(None, 2, a)._validate())
+        self.assertFalse(huffman.HuffmanNode(None, 5, a, huffman.HuffmanNode(None, 3))._validate())
\ No newline at end of file
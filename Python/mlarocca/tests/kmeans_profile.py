@@ -1,158 +1,225 @@
-import math
+"""Profiling of the k-means variants, on datasets of different sizes and for different numbers of clusters.
+
+Usage (from this folder, with the `Python` folder in PYTHONPATH):
+    python kmeans_profile.py [crafted|incremental|all] [--runs RUNS] [--output OUTPUT] [--seed SEED] [--memory]
+"""
+import argparse
 import cProfile
+import csv
 import pstats
-import unittest
-
-from typing import List, Tuple
-from random import randrange, random, sample
+import random
+import tracemalloc
 
-import mlarocca.datastructures.clustering.kmeans as kmeans
+import numpy as np
 
+from typing import Callable, List, Optional, Tuple
 
-class KmeansProfile(unittest.TestCase):
-    OutputFileName = 'data/stats_kmeans.csv'
-    OutputFileNameInc = 'data/stats_kmeans_inc.csv'
-
-    @staticmethod
-    def write_header(f) -> None:
-        """Write the header of the output csv file for stats"""
-        f.write('algorithm,n,k,method_name,total_time,cumulative_time,per_call_time\n')
-
-    @staticmethod
-    def write_row(f, algorithm: str, n: int, k:int, method_name: str, total_time: float,
-                  cumulative_time: float, per_call_time: float) -> None:
-        """Add a row of data to the stats csv file"""
-        f.write(f'{algorithm},{n},{k},{method_name},{total_time},{cumulative_time},{per_call_time}\n')
-
-    @staticmethod
-    def get_running_times(st: pstats.Stats) -> List[Tuple[str, float, float, float]]:
-        ps = st.strip_dirs().stats
-
-        def tracked_method(k):
-            return 'k_means_' in k[2] or '__partition_points' in k[2]
-
-        keys = list(filter(tracked_method, ps.keys()))
-        # cc, nc, tt, ct, callers = ps[key]
-        #  ps[key][2] -> tt -> total time
-        #  ps[key][3] -> ct -> cumulative time
-        return [(key[2], ps[key][2], ps[key][3], ps[key][3] / ps[key][1]) for key in keys]
-
-    @staticmethod
-    def create_random_cluster(centroid, radius, n_points):
-        def random_point_in_circle():
-            alpha = random() * 2 * math.pi
-            r = radius * math.sqrt(random())
-            # r is dim-dimensional root of radius
-
-            x = centroid[0] + r * math.cos(alpha)
-            y = centroid[1] + r * math.sin(alpha)
-            return x, y
-
-        return [random_point_in_circle() for _ in range(n_points)]
-
-    @staticmethod
-    def random_point(radius):
-        return random() * radius - radius / 2, random() * radius - radius / 2
-
-    @staticmethod
-    def createRandomDataset(n, k, radius=10):
-        data_centroids = [KmeansProfile.random_point(radius) for _ in range(k)]
-        data_clusters = [KmeansProfile.create_random_cluster(P, 0.25 + random(), randrange(n//k//10, n//k + 1))
-                         for P in data_centroids]
-        noise = [KmeansProfile.random_point(radius) for _ in range(n//k)]
-
-        return [p for C in data_clusters for p in C] + noise
-
-    def test_profile_kmeans_crafted(self) -> None:
-        with open(KmeansProfile.OutputFileName, 'w') as f:
-            KmeansProfile.write_header(f)
-               
-            runs = 100
-            for max_n in [1000, 10000, 100000]:
-                max_iter = min(max_n // 10, 1000)
-                for k in [5, 10, 20, 35, 50, 75, 100, 200]:
-                    for _ in range(runs):
-                        pro_classic = cProfile.Profile()
-                        pro_boosted = cProfile.Profile()
-                        pro_kd = cProfile.Profile()
-
-                        dataset = KmeansProfile.createRandomDataset(randrange(max(k * 10, max_n // 10), max_n + 1), k)
-                        n = len(dataset)
-                        pro_classic.runcall(kmeans.k_means_classic, dataset, k, max_iter)
-                        pro_boosted.runcall(kmeans.k_means_boosted, dataset, k, max_iter)
-                        pro_kd.runcall(kmeans.k_means_kd_tree, dataset, k, max_iter)
-
-                        st_classic = pstats.Stats(pro_classic)
-                        st_boosted = pstats.Stats(pro_boosted)
-                        st_kd = pstats.Stats(pro_kd)
-                        # st_classic.strip_dirs().sort_stats('cumulative').print_stats(20)
-                        # st_kd.strip_dirs().sort_stats('cumulative').print_stats(20)
-
-                        for method_name, total_time, cumulative_time, per_call_time in KmeansProfile.get_running_times(
-                                st_classic):
-                            KmeansProfile.write_row(f, 'classic', n, k, method_name, total_time, cumulative_time,
-                                                    per_call_time)
-
-                        for method_name, total_time, cumulative_time, per_call_time in KmeansProfile.get_running_times(
-                                st_boosted):
-                            KmeansProfile.write_row(f, 'boosted', n, k, method_name, total_time, cumulative_time,
-                                                    per_call_time)
-
-                        for method_name, total_time, cumulative_time, per_call_time in KmeansProfile.get_running_times(
-                                st_kd):
-                            KmeansProfile.write_row(f, 'kdtree', n, k, method_name, total_time, cumulative_time,
-                                                    per_call_time)
-
-
-    def test_profile_kmeans(self) -> None:
-        with open(KmeansProfile.OutputFileNameInc, 'w') as f:
-            KmeansProfile.write_header(f)
-
-            n = 1000
-            runs = 10
-            dataset = [KmeansProfile.random_point(100) for _ in range(n)]
-
-            step = 100
-            for n in range(len(dataset), 10000, step):
-                for _ in range(step):
-                    dataset.append(KmeansProfile.random_point(1000))
-
-                max_iter = 10
-                for k in [5, 10, 20, 35, 50, 75, 100, 200]:
-                    pro_classic = cProfile.Profile()
-                    pro_boosted = cProfile.Profile()
-                    pro_kd = cProfile.Profile()
-
-                    for _ in range(runs):
-                        n = len(dataset)
-                        # pro_classic.runcall(kmeans.k_means_classic, dataset, k, max_iter)
-                        pro_boosted.runcall(kmeans.k_means_boosted, dataset, k, max_iter)
-                        pro_kd.runcall(kmeans.k_means_kd_tree, dataset, k, max_iter)
-
-                        # st_classic = pstats.Stats(pro_classic)
-                        st_boosted = pstats.Stats(pro_boosted)
-                        st_kd = pstats.Stats(pro_kd)
+import mlarocca.datastructures.clustering.kmeans as kmeans
+from mlarocca.tests.profile_utils import get_running_times, write_header
+
+rng = np.random.default_rng()
+
+RUNS_CRAFTED = 100
+RUNS_INCREMENTAL = 10
+# Whether the incremental profile also runs the classic (brute-force, NumPy) k-means
+RUN_CLASSIC = False
+# The default seed for the random generators, so that runs of the profile are comparable
+SEED = 42
+OUTPUT_FILE_NAME = 'data/stats_kmeans.csv'
+OUTPUT_FILE_NAME_INC = 'data/stats_kmeans_inc.csv'
+MAX_NS = [1000, 10000, 100000]
+NUM_CLUSTERS = [5, 10, 20, 35, 50, 75, 100, 200]
+# The number of clusters in the random datasets: k-means is then run, on the same datasets, for each k in NUM_CLUSTERS
+DATASET_CLUSTERS = 10
+# All the k-means variants, and their partitioning functions
+TRACKED_METHODS = frozenset(name for name in vars(kmeans) if name.startswith(('k_means_', '__partition_points')))
+HEADER = ('algorithm', 'n', 'k', 'method_name', 'total_time', 'cumulative_time', 'per_call_time')
+
+
+def add_rows(rows: List[Tuple], algorithm: str, n: int, k: int, st: pstats.Stats,
+             peak_bytes: Optional[int] = None) -> None:
+    """Add a row of data, for each tracked method, to a batch of rows for the stats csv file
+    (with the peak memory used, if it was traced)"""
+    memory = () if peak_bytes is None else (peak_bytes,)
+    rows.extend((algorithm, n, k, *running_times, *memory) for running_times in get_running_times(st, TRACKED_METHODS))
+
+
+def run_profiled(pro: cProfile.Profile, memory: bool, func: Callable, *args) -> int:
+    """Calls `func(*args)` with the profiler `pro`; if `memory` is True, it also traces memory allocations.
+
+    Returns:
+        The peak size (in bytes) of the memory traced during the call, or 0 if memory wasn't traced.
+    """
+    if not memory:
+        pro.runcall(func, *args)
+        return 0
+    tracemalloc.start()
+    try:
+        pro.runcall(func, *args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def create_random_cluster(centroid, radius, n_points) -> np.ndarray:
+    """Generates, all at once, `n_points` random points uniformly distributed in a circle."""
+    alpha = rng.random(n_points) * 2 * np.pi
+    # r is dim-dimensional root of radius
+    r = radius * np.sqrt(rng.random(n_points))
+
+    x = centroid[0] + r * np.cos(alpha)
+    y = centroid[1] + r * np.sin(alpha)
+    return np.column_stack((x, y))
+
+
+def random_points(radius, n_points) -> np.ndarray:
+    """Generates, all at once, `n_points` random points uniformly distributed in a square of side `radius`,
+    centered in the origin."""
+    return rng.random((n_points, 2)) * radius - radius / 2
+
+
+def createRandomDataset(n, k, radius=10) -> np.ndarray:
+    data_centroids = random_points(radius, k)
+    data_clusters = [create_random_cluster(P, 0.25 + rng.random(), rng.integers(n//k//10, n//k + 1))
+                     for P in data_centroids]
+    noise = random_points(radius, n//k)
+
+    return np.concatenate(data_clusters + [noise])
+
+
+def seed_random_generators(seed: Optional[int]) -> None:
+    """Seeds both Python's random generator (also used by k-means to initialize the centroids) and NumPy's one
+    (used to generate the datasets)."""
+    global rng
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+
+
+def warm_up_numba() -> None:
+    """Runs the Numba k-means once, on a tiny dataset, so that the JIT compilation of its kernels (or their loading
+    from the cache) doesn't end up in the first profiled run."""
+    kmeans.k_means_numba(np.arange(20.).reshape(10, 2), 2, 1)
+
+
+def profile_kmeans_crafted(runs: int, output_file_name: str, seed: Optional[int] = SEED, memory: bool = False) -> None:
+    warm_up_numba()
+    seed_random_generators(seed)
+    with open(output_file_name, 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        write_header(writer, HEADER, memory)
+
+        # The same profilers are reused (and cleared) for all runs
+        pro_classic = cProfile.Profile()
+        pro_numba = cProfile.Profile()
+        pro_kd = cProfile.Profile()
+        for max_n in MAX_NS:
+            max_iter = min(max_n // 10, 1000)
+            # A pool of datasets is generated once for each max_n, and shared by all values of k.
+            # The size requested is at least 10 points per cluster for the largest k, capped at max_n (so, for the
+            # smallest max_n, all datasets are requested with exactly max_n points). Since createRandomDataset(n, ...)
+            # returns between about n/5 and 11n/10 points, this only guarantees at least 2 points per cluster, or
+            # 1 when the cap applies: still enough for k-means to choose its initial centroids among the points
+            min_n = min(max(NUM_CLUSTERS) * 10, max_n)
+            datasets = [createRandomDataset(random.randrange(max(min_n, max_n // 10), max_n + 1), DATASET_CLUSTERS)
+                        for _ in range(runs)]
+            for k in NUM_CLUSTERS:
+                rows = []
+                for dataset in datasets:
+                    pro_classic.clear()
+                    pro_numba.clear()
+                    pro_kd.clear()
+
+                    n = len(dataset)
+                    peak_classic = run_profiled(pro_classic, memory, kmeans.k_means_classic, dataset, k, max_iter)
+                    peak_numba = run_profiled(pro_numba, memory, kmeans.k_means_numba, dataset, k, max_iter)
+                    peak_kd = run_profiled(pro_kd, memory, kmeans.k_means_kd_tree, dataset, k, max_iter)
+
+                    st_classic = pstats.Stats(pro_classic)
+                    st_numba = pstats.Stats(pro_numba)
+                    st_kd = pstats.Stats(pro_kd)
                     # st_classic.strip_dirs().sort_stats('cumulative').print_stats(20)
-                    # st_boosted.strip_dirs().sort_stats('cumulative').print_stats(20)
                     # st_kd.strip_dirs().sort_stats('cumulative').print_stats(20)
 
-                    # for method_name, total_time, cumulative_time, per_call_time in KmeansProfile.get_running_times(
-                    #         st_classic):
-                    #     KmeansProfile.write_row(f, 'classic', n, k, method_name, total_time, cumulative_time,
-                    #                             per_call_time)
-                    #
-                    for method_name, total_time, cumulative_time, per_call_time in KmeansProfile.get_running_times(
-                            st_boosted):
-                        KmeansProfile.write_row(f, 'boosted', n, k, method_name, total_time, cumulative_time,
-                                                per_call_time)
-
-                    for method_name, total_time, cumulative_time, per_call_time in KmeansProfile.get_running_times(
-                            st_kd):
-                        KmeansProfile.write_row(f, 'kdtree', n, k, method_name, total_time, cumulative_time,
-                                                per_call_time)
-
-                    f.flush()
+                    add_rows(rows, 'classic', n, k, st_classic, peak_classic if memory else None)
+                    add_rows(rows, 'numba', n, k, st_numba, peak_numba if memory else None)
+                    add_rows(rows, 'kdtree', n, k, st_kd, peak_kd if memory else None)
+                writer.writerows(rows)
+
+
+def profile_kmeans(runs: int, output_file_name: str, seed: Optional[int] = SEED, memory: bool = False) -> None:
+    warm_up_numba()
+    seed_random_generators(seed)
+    with open(output_file_name, 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        write_header(writer, HEADER, memory)
+
+        # The dataset is kept as an (n, 2) array, so that k-means doesn't need to convert it at each run
+        dataset = random_points(100, 1000)
+
+        # The same profilers are reused (and cleared) for each (n, k)
+        pro_classic = cProfile.Profile() if RUN_CLASSIC else None
+        pro_numba = cProfile.Profile()
+        pro_kd = cProfile.Profile()
+        step = 100
+        for _ in range(len(dataset), 10000, step):
+            dataset = np.concatenate((dataset, random_points(1000, step)))
+            n = len(dataset)
+
+            max_iter = 10
+            for k in NUM_CLUSTERS:
+                if RUN_CLASSIC:
+                    pro_classic.clear()
+                pro_numba.clear()
+                pro_kd.clear()
+
+                # The peak memory is the largest across all runs
+                peak_classic = peak_numba = peak_kd = 0
+                for _ in range(runs):
+                    if RUN_CLASSIC:
+                        peak_classic = max(peak_classic, run_profiled(pro_classic, memory, kmeans.k_means_classic,
+                                                                      dataset, k, max_iter))
+                    peak_numba = max(peak_numba, run_profiled(pro_numba, memory, kmeans.k_means_numba,
+                                                              dataset, k, max_iter))
+                    peak_kd = max(peak_kd, run_profiled(pro_kd, memory, kmeans.k_means_kd_tree, dataset, k, max_iter))
+
+                # Each profiler accumulates the stats for all the runs
+                st_numba = pstats.Stats(pro_numba)
+                st_kd = pstats.Stats(pro_kd)
+                # st_numba.strip_dirs().sort_stats('cumulative').print_stats(20)
+                # st_kd.strip_dirs().sort_stats('cumulative').print_stats(20)
+
+                rows = []
+                if RUN_CLASSIC:
+                    add_rows(rows, 'classic', n, k, pstats.Stats(pro_classic), peak_classic if memory else None)
+                add_rows(rows, 'numba', n, k, st_numba, peak_numba if memory else None)
+                add_rows(rows, 'kdtree', n, k, st_kd, peak_kd if memory else None)
+                writer.writerows(rows)
+
+                f.flush()
+
+
+PROFILES = {
+    'crafted': (profile_kmeans_crafted, RUNS_CRAFTED, OUTPUT_FILE_NAME),
+    'incremental': (profile_kmeans, RUNS_INCREMENTAL, OUTPUT_FILE_NAME_INC),
+}
 
 
 if __name__ == '__main__':
-    unittest.main()
+    parser = argparse.ArgumentParser(description='Profiles the k-means variants.')
+    parser.add_argument('profile', nargs='?', choices=[*PROFILES, 'all'], default='all',
+                        help='The profile to run (default: all of them).')
+    parser.add_argument('--runs', type=int, help='The number of runs for each configuration '
+                                                 '(default: a different number for each profile).')
+    parser.add_argument('--output', help='The output csv file (default: a different file for each profile). '
+                                         'Can only be used when running a single profile.')
+    parser.add_argument('--seed', type=int, default=SEED, help=f'The seed for the random generators '
+                                                               f'(default: {SEED}).')
+    parser.add_argument('--memory', action='store_true', help='Also trace memory allocations, and add the peak '
+                                                              'memory to the stats (slows the profile down).')
+    args = parser.parse_args()
+    if args.output is not None and args.profile == 'all':
+        parser.error('--output can only be used when running a single profile')
+
+    for profile_name in (PROFILES if args.profile == 'all' else [args.profile]):
+        profile, default_runs, default_output_file_name = PROFILES[profile_name]
+        profile(args.runs or default_runs, args.output or default_output_file_name, args.seed, args.memory)
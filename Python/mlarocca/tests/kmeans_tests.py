@@ -0,0 +1,67 @@
+import unittest
+import random
+
+import numpy as np
+
+import mlarocca.datastructures.clustering.kmeans as kmeans
+
+
+class KmeansTest(unittest.TestCase):
+    Centers = [(0., 0.), (10., 10.), (-10., 10.)]
+
+    @staticmethod
+    def create_dataset(points_per_cluster: int = 50):
+        return [(x + random.uniform(-1, 1), y + random.uniform(-1, 1))
+                for x, y in KmeansTest.Centers for _ in range(points_per_cluster)]
+
+    def assert_valid_partition(self, dataset, centroids, cluster_indices):
+        self.assertEqual(len(dataset), len(cluster_indices))
+        for p, i in zip(dataset, cluster_indices):
+            closest = min(range(len(centroids)),
+                          key=lambda j: sum((p[t] - centroids[j][t]) ** 2 for t in range(len(p))))
+            self.assertEqual(closest, i)
+
+    def test_k_means_classic(self):
+        dataset = KmeansTest.create_dataset()
+        centroids, cluster_indices = kmeans.k_means_classic(dataset, 3, 100)
+        self.assert_valid_partition(dataset, centroids, cluster_indices)
+
+    def test_k_means_compact(self):
+        dataset = KmeansTest.create_dataset()
+        centroids, cluster_indices = kmeans.k_means_compact(dataset, 3, 100)
+        self.assert_valid_partition(dataset, centroids, cluster_indices)
+
+    def test_k_means_kd_tree(self):
+        dataset = KmeansTest.create_dataset()
+        centroids, cluster_indices = kmeans.k_means_kd_tree(dataset, 3, 100)
+        self.assert_valid_partition(dataset, centroids, cluster_indices)
+
+    def test_k_means_numba(self):
+        dataset = KmeansTest.create_dataset()
+        centroids, cluster_indices = kmeans.k_means_numba(dataset, 3, 100)
+        self.assert_valid_partition(dataset, centroids, cluster_indices)
+
+    def test_partitioning_functions_agree(self):
+        dataset = KmeansTest.create_dataset()
+        centroids = [(1., 1.), (9., 9.), (-9., 9.)]
+        points = np.asarray(dataset)
+        # Module-level "dunder" names would be mangled if accessed as attributes inside a class body
+        expected = list(getattr(kmeans, '__partition_points_kd_tree')(points, centroids))
+        self.assertEqual(expected, list(getattr(kmeans, '__partition_points')(points, centroids)))
+        self.assertEqual(expected, list(getattr(kmeans, '__partition_points_compact')(points, centroids)))
+        self.assertEqual(expected, list(getattr(kmeans, '__partition_points_numba')(points, centroids)))
+
+    def test_partitioning_far_from_origin(self):
+        # Points are stored in single precision: far from the origin, the brute-force partitioning must still
+        # assign them to the same centroids as the k-d tree
+        rng = np.random.default_rng(42)
+        for offset in [1e3, 1e4]:
+            points = (offset + rng.uniform(-10, 10, (2000, 2))).astype(np.float32)
+            centroids = [tuple(c) for c in offset + rng.uniform(-10, 10, (8, 2))]
+            expected = getattr(kmeans, '__partition_points_kd_tree')(points, centroids)
+            actual = getattr(kmeans, '__partition_points')(points, centroids)
+            self.assertEqual(0, np.count_nonzero(expected != actual))
+
+
+if __name__ == '__main__':
+    unittest.main()
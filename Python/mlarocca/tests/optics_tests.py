@@ -0,0 +1,27 @@
+import unittest
+
+from mlarocca.datastructures.clustering.optics import optics, optics_to_clusters, NOISE
+
+
+class OpticsTest(unittest.TestCase):
+    Points = [(0., 0.), (0., 1.), (1., 0.), (0.5, 0.5), (5., 5.), (5., 6.), (6., 5.), (20., 20.)]
+
+    def test_optics(self):
+        reachability_distances, ordering = optics(OpticsTest.Points, 1.5, 3)
+        self.assertEqual(sorted(range(len(OpticsTest.Points))), sorted(ordering))
+        self.assertEqual(len(OpticsTest.Points), len(reachability_distances))
+        # The first point processed for each dense region has no reachability distance, nor does the outlier
+        self.assertIsNone(reachability_distances[0])
+        self.assertIsNone(reachability_distances[4])
+        self.assertIsNone(reachability_distances[7])
+        for i in [1, 2, 3, 5, 6]:
+            self.assertLessEqual(reachability_distances[i], 1.5)
+
+    def test_optics_to_clusters(self):
+        reachability_distances, ordering = optics(OpticsTest.Points, 1.5, 3)
+        self.assertEqual([1, 1, 1, 1, 2, 2, 2, NOISE],
+                         optics_to_clusters(ordering, reachability_distances, 1.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
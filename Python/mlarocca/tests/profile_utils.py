@@ -0,0 +1,36 @@
+"""Helpers shared by the profiling scripts in this folder."""
+import pstats
+import tracemalloc
+
+from typing import Callable, FrozenSet, List, Tuple
+
+# The extra column added to the stats when memory is traced
+MEMORY_HEADER = ('peak_bytes',)
+
+
+def write_header(writer, header: Tuple[str, ...], memory: bool = False) -> None:
+    """Write the header of the output csv file for stats (with the peak memory column, if memory is traced)"""
+    writer.writerow(header + MEMORY_HEADER if memory else header)
+
+
+def get_running_times(st: pstats.Stats, tracked_names: FrozenSet[str]) -> List[Tuple[str, float, float, float]]:
+    """Extracts, in a single pass over the stats, the total time, cumulative time, and time per call of all the
+    tracked methods (matched by exact name, once the stats are stripped of their directories)."""
+    # cc, nc, tt, ct, callers = v
+    #  v[2] -> tt -> total time
+    #  v[3] -> ct -> cumulative time
+    times = {k[2]: (v[2], v[3], v[3] / v[1] if v[1] > 0 else 0.)
+             for k, v in st.strip_dirs().stats.items() if k[2] in tracked_names}
+    return [(name, *method_times) for name, method_times in times.items()]
+
+
+def trace_memory(func: Callable[..., List[Tuple]], *args) -> List[Tuple]:
+    """Runs `func(*args)`, that must return a batch of csv rows, while tracing memory allocations,
+    and adds to each row the peak size (in bytes) of the traced memory."""
+    tracemalloc.start()
+    try:
+        rows = func(*args)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return [(*row, peak_bytes) for row in rows]